@@ -0,0 +1,118 @@
+"""
+Замер поиска почти-дубликатов при записи новостей: синтетические заголовки (сюжеты, перепечатанные
+несколькими лентами с заменой, удалением или перестановкой слова) пишутся пакетами через
+sqlighter3_news.add_news во временную БД. По мере роста таблицы выводится время записи
+на новость с разбором почти-дубликатов и без него и среднее число проверенных кандидатов —
+при LSH оно не растёт вместе с таблицей. В конце — полнота и точность на известной разметке.
+
+    python bench_near_duplicates.py [--news 200000] [--per-day 3000] [--batch 500]
+"""
+from pathlib import Path
+import argparse
+import random
+import tempfile
+import time
+import near_duplicates
+import sqlighter3_connect
+import sqlighter3_news
+
+SYLLABLES = ['ра', 'ко', 'не', 'ти', 'на', 'ло', 'ве', 'ст', 'ми', 'до', 'за', 'пр', 'ин', 'ол', 'га', 'ру']
+ENDINGS = ['', 'а', 'ы', 'ов', 'ами', 'ий', 'ая', 'ое', 'ет', 'ил']
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_news(count: int, per_day: int, rng: random.Random) -> list[tuple[int, str, str, int]]:
+    """ (ts, раздел, заголовок, номер сюжета): сюжет и 0-3 его пересказа в пределах нескольких часов """
+    vocabulary = make_vocabulary(20000, rng)
+    news, story, ts = [], 0, 1_700_000_000
+    step = 86400 // per_day
+    while len(news) < count:
+        words = rng.sample(vocabulary, rng.randint(7, 12))
+        title = ' '.join(words)
+        news.append((ts, f'Лента {rng.randint(1, 20)}', title.capitalize(), story))
+        for _ in range(rng.choice((0, 0, 1, 2, 3))):
+            variant = list(words)
+            change = rng.randrange(3)
+            position = rng.randrange(len(variant))
+            if change == 0:
+                variant[position] = rng.choice(vocabulary)
+            elif change == 1:
+                del variant[position]
+            else:
+                variant[position] = variant[position] + rng.choice(ENDINGS)
+                rng.shuffle(variant)
+            news.append((ts + rng.randint(60, 6 * 3600), f'Лента {rng.randint(1, 20)}',
+                         ' '.join(variant).capitalize(), story))
+        story += 1
+        ts += step
+    return news[:count]
+
+
+def bench(news: list[tuple], batch: int, report_every: int, clustering: bool) -> dict:
+    """
+    Пишет новости пакетами во временную БД и печатает время на новость по мере роста таблицы.
+    Возвращает {'stories': {id: сюжет}, 'dups': {id: cluster_id}} (при clustering).
+    """
+    label = 'с разбором' if clustering else 'без разбора'
+    with tempfile.TemporaryDirectory() as tmp:
+        connection = sqlighter3_connect.connect(Path(tmp) / 'bench.db')
+        sqlighter3_news.create_tables(connection)
+        elapsed, processed, candidates, done = 0.0, 0, 0, 0
+        for start in range(0, len(news), batch):
+            rows = [(ts, section, title) for ts, section, title, _ in news[start:start + batch]]
+            started = time.perf_counter()
+            with connection:
+                sqlighter3_news.add_news(connection, rows, cluster=False)
+                if clustering:
+                    stats = near_duplicates.cluster_new_news(connection)
+                    processed += stats['processed']
+                    candidates += stats['candidates']
+            elapsed += time.perf_counter() - started
+            done += len(rows)
+            if done % report_every < batch:
+                text = f"{label:>12}: новостей {done:8d}, {elapsed / report_every * 1e6:8.1f} мкс/новость"
+                if clustering:
+                    text += f", кандидатов на новость {candidates / max(processed, 1):.2f}"
+                print(text)
+                elapsed, processed, candidates = 0.0, 0, 0
+        result = {}
+        if clustering:
+            story_by_title = {(ts, title): story for ts, _, title, story in news}
+            result['stories'] = {news_id: story_by_title[(ts, title)]
+                                 for news_id, ts, title in connection.execute("SELECT id, ts, title FROM news")}
+            result['dups'] = dict(connection.execute("SELECT id, cluster_id FROM news_dups").fetchall())
+        connection.close()
+        return result
+
+
+def quality(result: dict) -> tuple[float, float]:
+    """ Полнота (доля найденных пересказов) и точность (доля верных привязок к сюжету) """
+    stories, dups = result['stories'], result['dups']
+    first = {}
+    for news_id in sorted(stories):
+        first.setdefault(stories[news_id], news_id)
+    expected = sum(1 for news_id, story in stories.items() if first[story] != news_id)
+    correct = sum(1 for news_id, cluster_id in dups.items() if stories[news_id] == stories[cluster_id])
+    return correct / expected if expected else 1.0, correct / len(dups) if dups else 1.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Замер поиска почти-дубликатов при записи новостей")
+    parser.add_argument('--news', type=int, default=200000, help="Сколько новостей записать")
+    parser.add_argument('--per-day', type=int, default=3000, help="Сюжетов в сутки")
+    parser.add_argument('--batch', type=int, default=500, help="Новостей в одном вызове add_news")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    news = make_news(args.news, args.per_day, random.Random(args.seed))
+    report_every = max(args.news // 10 // args.batch * args.batch, args.batch)
+    bench(news, args.batch, report_every, clustering=False)
+    result = bench(news, args.batch, report_every, clustering=True)
+    recall, precision = quality(result)
+    print(f"Полнота: {recall:.1%}, точность: {precision:.1%}")
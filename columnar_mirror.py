@@ -0,0 +1,257 @@
+"""
+Колоночная копия БД новостей и котировок в Parquet (pyarrow) для анализа: наборы данных
+    news/month=YYYY-MM/part-NNNNNN.parquet     — id, ts, section, title, cluster_id (почти-дубликат: id
+                                                  представителя кластера, у представителей NULL);
+    futures/year=YYYY/part-NNNNNN.parquet      — колонки таблицы Futures.
+Обновление только дописывает новые файлы: новости с id выше сохранённого watermark, свечи с TRADEDATE
+после последней записанной. Если в БД что-то удалено (число строк до watermark не совпадает) или
+последняя свеча перезаписана загрузчиком с другими значениями, набор данных выгружается заново
+(как и после повторной разметки почти-дубликатов: near_duplicates.py --rebuild).
+Состояние — mirror.json рядом с наборами данных; прерванное обновление продолжается с места остановки.
+Когда в разделе набирается больше COMPACT_PARTS файлов, они сливаются в один.
+
+Чтение (read_news, read_futures) — только нужные колонки, фильтры по ts/id/cluster_id проверяются
+по статистике групп строк и разделам month, файлы отображаются в память.
+
+    python columnar_mirror.py --out path/to/mirror [--news-db ...] [--quote-db ...] [--full]
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+import sqlighter3_connect
+import sqlighter3_RTS_day
+
+STATE_NAME = 'mirror.json'
+BATCH_SIZE = 200000  # Строк новостей за одно обращение к курсору
+ROW_GROUP_SIZE = 65536  # Строк в группе: по статистике групп отбрасываются неподходящие диапазоны ts и id
+COMPACT_PARTS = 8  # Больше файлов в разделе — слить в один
+
+NEWS_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('ts', pa.int64()), ('section', pa.string()), ('title', pa.string()),
+    ('cluster_id', pa.int64()),
+])
+FUTURES_SCHEMA = pa.schema([
+    ('TRADEDATE', pa.string()), ('SECID', pa.string()), ('OPEN', pa.float64()), ('LOW', pa.float64()),
+    ('HIGH', pa.float64()), ('CLOSE', pa.float64()), ('LSTTRADE', pa.string()),
+])
+PARTITIONING = {
+    'news': ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive'),
+    'futures': ds.partitioning(pa.schema([('year', pa.string())]), flavor='hive'),
+}
+
+
+def load_state(out_dir: Path) -> dict:
+    try:
+        return json.loads((out_dir / STATE_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(out_dir: Path, state: dict) -> None:
+    """ Сохраняет состояние через временный файл """
+    tmp = out_dir / (STATE_NAME + '.tmp')
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=1), encoding='utf-8')
+    os.replace(tmp, out_dir / STATE_NAME)
+
+
+def write_parts(dataset_dir: Path, table: pa.Table, keys: np.ndarray, field: str, seq: int) -> tuple[int, set[str]]:
+    """
+    Пишет строки table в разделы field=key (по одному новому файлу part-<seq> на раздел).
+    Возвращает следующий номер файла и затронутые разделы.
+    """
+    touched = set()
+    for key in np.unique(keys):
+        part_dir = dataset_dir / f'{field}={key}'
+        part_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table.filter(pa.array(keys == key)), part_dir / f'part-{seq:06d}.parquet',
+                       row_group_size=ROW_GROUP_SIZE, compression='zstd')
+        seq += 1
+        touched.add(part_dir.name)
+    return seq, touched
+
+
+def compact(dataset_dir: Path, partitions: set[str], seq: int) -> int:
+    """ Сливает файлы разделов, где их больше COMPACT_PARTS, в один (порядок строк сохраняется) """
+    for name in sorted(partitions):
+        parts = sorted((dataset_dir / name).glob('part-*.parquet'))
+        if len(parts) <= COMPACT_PARTS:
+            continue
+        table = pa.concat_tables(pq.read_table(part) for part in parts)
+        tmp = dataset_dir / name / '_compact.tmp'  # Файлы с '_' в начале не читаются как часть набора
+        pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression='zstd')
+        os.replace(tmp, dataset_dir / name / f'part-{seq:06d}.parquet')
+        seq += 1
+        for part in parts:
+            part.unlink()
+    return seq
+
+
+def dataset_rows(dataset_dir: Path) -> int:
+    """ Число строк в наборе данных (по метаданным файлов) """
+    if not dataset_dir.exists():
+        return 0
+    return ds.dataset(dataset_dir, format='parquet', partitioning='hive').count_rows()
+
+
+def sync_news(connection: sqlite3.Connection, out_dir: Path, full: bool = False, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Дописывает в набор news новости с id выше watermark (не дальше разобранных на почти-дубликаты,
+    чтобы cluster_id был окончательным). Удаления в БД, другое число почти-дубликатов до watermark
+    (повторная разметка) или расхождение с файлами — выгрузка заново.
+    Возвращает число дописанных строк.
+    """
+    dataset_dir = out_dir / 'news'
+    state = load_state(out_dir)
+    news = {} if full else state.get('news', {})
+    watermark, rows_total, seq = news.get('watermark', 0), news.get('rows', 0), news.get('seq', 0)
+    has_dups = connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'news_dups'").fetchone() is not None
+    dups = (connection.execute("SELECT COUNT(*) FROM news_dups WHERE id <= ?", (watermark,)).fetchone()[0]
+            if has_dups else 0)
+    limit_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'near_dup_state'").fetchone():
+        limit_id = min(limit_id, connection.execute("SELECT last_id FROM near_dup_state").fetchone()[0])
+    if (full or watermark > limit_id or dataset_rows(dataset_dir) != rows_total
+            or dups != news.get('dups', 0)
+            or connection.execute("SELECT COUNT(*) FROM news WHERE id <= ?", (watermark,)).fetchone()[0] != rows_total):
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        watermark, rows_total, seq, dups = 0, 0, 0, 0
+
+    cursor = connection.execute(f"""
+        SELECT n.id, n.ts, s.name, n.title, {'d.cluster_id' if has_dups else 'NULL'}
+        FROM news n
+        LEFT JOIN sections s ON s.id = n.section_id
+        {'LEFT JOIN news_dups d ON d.id = n.id' if has_dups else ''}
+        WHERE n.id > ? AND n.id <= ?
+        ORDER BY n.id
+    """, (watermark, limit_id))
+    added, touched = 0, set()
+    while rows := cursor.fetchmany(batch_size):
+        table = pa.Table.from_arrays([pa.array(column, type=field.type)
+                                      for column, field in zip(zip(*rows), NEWS_SCHEMA)], schema=NEWS_SCHEMA)
+        months = table['ts'].to_numpy().astype('datetime64[s]').astype('datetime64[M]').astype(str)
+        seq, months_touched = write_parts(dataset_dir, table, months, 'month', seq)
+        touched |= months_touched
+        added += len(rows)
+        dups += len(rows) - table['cluster_id'].null_count
+        state['news'] = {'watermark': rows[-1][0], 'rows': rows_total + added, 'seq': seq, 'dups': dups}
+        save_state(out_dir, state)  # Файлы пакета записаны — watermark можно сдвигать
+    if touched:
+        state['news']['seq'] = compact(dataset_dir, touched, seq)
+        save_state(out_dir, state)
+    return added
+
+
+def sync_futures(connection: sqlite3.Connection, out_dir: Path, full: bool = False) -> int:
+    """
+    Дописывает в набор futures свечи после последней записанной. Если последняя записанная свеча
+    в БД изменилась (загрузчик перезаписывает последний день) или строки до неё удалены — выгрузка
+    заново (таблица небольшая). Возвращает число записанных строк.
+    """
+    dataset_dir = out_dir / 'futures'
+    state = load_state(out_dir)
+    futures = {} if full else state.get('futures', {})
+    watermark, seq = futures.get('watermark'), futures.get('seq', 0)
+    columns = ', '.join(sqlighter3_RTS_day.FUTURES_COLUMNS)
+    rows = connection.execute(f"SELECT {columns} FROM Futures WHERE TRADEDATE >= ? ORDER BY TRADEDATE",
+                              (watermark or '',)).fetchall()
+    if (watermark and rows and list(rows[0]) == futures.get('last') and dataset_rows(dataset_dir) == futures['rows']
+            and connection.execute("SELECT COUNT(*) FROM Futures WHERE TRADEDATE <= ?",
+                                   (watermark,)).fetchone()[0] == futures['rows']):
+        rows, rows_total = rows[1:], futures['rows']
+    else:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        rows = connection.execute(f"SELECT {columns} FROM Futures ORDER BY TRADEDATE").fetchall()
+        rows_total, seq = 0, 0
+        state.pop('futures', None)
+    if not rows:
+        save_state(out_dir, state)
+        return 0
+    table = pa.Table.from_arrays([pa.array([str(value) if field.type == pa.string() else value for value in column],
+                                           type=field.type)
+                                  for column, field in zip(zip(*rows), FUTURES_SCHEMA)], schema=FUTURES_SCHEMA)
+    years = np.array([str(row[0])[:4] for row in rows])
+    seq, touched = write_parts(dataset_dir, table, years, 'year', seq)
+    seq = compact(dataset_dir, touched, seq)
+    state['futures'] = {'watermark': str(rows[-1][0]), 'rows': rows_total + len(rows), 'seq': seq,
+                        'last': list(rows[-1])}
+    save_state(out_dir, state)
+    return len(rows)
+
+
+def open_dataset(out_dir: Path, name: str) -> ds.Dataset:
+    """ Набор данных с чтением файлов через отображение в память """
+    return ds.dataset(out_dir / name, format='parquet', partitioning=PARTITIONING[name],
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+
+def news_watermark(out_dir: Path, unique: bool = False) -> tuple[int, int]:
+    """ (watermark — максимальный id в копии, число новостей; unique — без почти-дубликатов) """
+    news = load_state(out_dir).get('news', {})
+    if not unique or not news.get('rows'):
+        return news.get('watermark', 0), news.get('rows', 0)
+    return news['watermark'], open_dataset(out_dir, 'news').count_rows(filter=ds.field('cluster_id').is_null())
+
+
+def read_news(out_dir: Path, ts_min: int | None = None, ts_max: int | None = None, id_min: int | None = None,
+              unique: bool = False, columns=('ts', 'title')) -> pd.DataFrame:
+    """
+    Новости копии ts_min < ts < ts_max (и id > id_min), отсортированные по ts (при равных ts — по id,
+    как в SQLite). Читаются только колонки columns и разделы month, пересекающиеся с диапазоном.
+    """
+    if not (out_dir / 'news').exists():
+        return pd.DataFrame({column: pd.Series(dtype=NEWS_SCHEMA.field(column).type.to_pandas_dtype())
+                             for column in columns})
+    conditions = []
+    if ts_min is not None:
+        conditions += [ds.field('ts') > ts_min, ds.field('month') >= str(np.datetime64(ts_min, 's').astype('datetime64[M]'))]
+    if ts_max is not None:
+        conditions += [ds.field('ts') < ts_max, ds.field('month') <= str(np.datetime64(ts_max, 's').astype('datetime64[M]'))]
+    if id_min is not None:
+        conditions.append(ds.field('id') > id_min)
+    if unique:
+        conditions.append(ds.field('cluster_id').is_null())
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    table = open_dataset(out_dir, 'news').to_table(columns=list(dict.fromkeys(('id', 'ts', *columns))), filter=condition)
+    table = table.sort_by([('ts', 'ascending'), ('id', 'ascending')])
+    return table.select(list(columns)).to_pandas()
+
+
+def read_futures(out_dir: Path, columns=('TRADEDATE', 'OPEN', 'CLOSE')) -> pd.DataFrame:
+    """ Свечи копии по возрастанию TRADEDATE, только колонки columns """
+    table = open_dataset(out_dir, 'futures').to_table(columns=list(dict.fromkeys(('TRADEDATE', *columns))))
+    return table.sort_by('TRADEDATE').select(list(columns)).to_pandas()
+
+
+if __name__ == '__main__':  # Обновление колоночной копии
+    parser = argparse.ArgumentParser(description="Колоночная копия (Parquet) новостей и котировок")
+    parser.add_argument('--news-db', default=r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db',
+                        help="БД новостей")
+    parser.add_argument('--quote-db', default=r'c:\Users\Alkor\gd\data_quote_db\RTS_day_rss_2025.db',
+                        help="БД котировок")
+    parser.add_argument('--out', default=r'C:\Users\Alkor\gd\data_mirror', help="Каталог копии")
+    parser.add_argument('--full', action='store_true', help="Выгрузить всё заново")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if Path(args.news_db).exists():
+        count = sync_news(sqlighter3_connect.get_connection(args.news_db, readonly=True), out_dir, args.full)
+        print(f"Новости: дописано строк {count}, всего {load_state(out_dir).get('news', {}).get('rows', 0)}")
+    else:
+        print("Ошибка: Файл базы данных новостей не найден.")
+    if Path(args.quote_db).exists():
+        count = sync_futures(sqlighter3_connect.get_connection(args.quote_db, readonly=True), out_dir, args.full)
+        print(f"Котировки: записано строк {count}, всего {load_state(out_dir).get('futures', {}).get('rows', 0)}")
+    else:
+        print("Ошибка: Файл базы данных котировок не найден.")
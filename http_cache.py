@@ -0,0 +1,141 @@
+"""
+Дисковый кэш HTTP-ответов для загрузчиков (MOEX ISS в update_futures_RTS_day_rss.py, rss ленты в main.py).
+Режимы:
+    passthrough — (по умолчанию) запросы идут в сеть, кэш не используется;
+    record      — запросы идут в сеть, успешные ответы сохраняются в кэш;
+    replay      — сеть не используется, ответы берутся из кэша (нет в кэше — как ошибка запроса).
+Тела ответов хранятся сжатыми gzip под своим sha256 (одинаковые тела — один файл),
+по URL хранится небольшой JSON со ссылкой на тело. Режим и каталог задаются
+переменными окружения HTTP_CACHE_MODE и HTTP_CACHE_DIR или функцией configure.
+
+Сводка по кэшу:
+    python http_cache.py [--dir path/to/cache]
+"""
+from dataclasses import dataclass
+from pathlib import Path
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+MODES = ('passthrough', 'record', 'replay')
+DEFAULT_DIR = Path(__file__).resolve().parent / 'http_cache'
+SAVED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')  # Заголовки, которые сохраняются с телом
+
+
+@dataclass
+class CachedResponse:
+    """ Сохранённый ответ """
+    url: str
+    status: int
+    headers: dict
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """ Запись через временный файл: параллельные процессы не увидят недописанный файл """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class HttpCache:
+    """
+    Кэш ответов по URL в каталоге directory: urls/xx/<sha1(url)>.json и bodies/xx/<sha256(тела)>.gz.
+    """
+
+    def __init__(self, mode: str = 'passthrough', directory: str | Path = DEFAULT_DIR):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим кэша {mode!r}, допустимы: {', '.join(MODES)}")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == 'replay'
+
+    @property
+    def record(self) -> bool:
+        return self.mode == 'record'
+
+    def _url_path(self, url: str) -> Path:
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.directory / 'urls' / key[:2] / f'{key}.json'
+
+    def _body_path(self, digest: str) -> Path:
+        return self.directory / 'bodies' / digest[:2] / f'{digest}.gz'
+
+    def load(self, url: str) -> CachedResponse | None:
+        """ Ответ из кэша или None """
+        try:
+            meta = json.loads(self._url_path(url).read_text(encoding='utf-8'))
+            body = gzip.decompress(self._body_path(meta['body']).read_bytes())
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedResponse(url, meta['status'], meta['headers'], body)
+
+    def save(self, url: str, status: int, headers, body: bytes) -> None:
+        """ Сохраняет ответ: тело — по своему хэшу (если такого ещё нет), ссылку — по URL """
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = self._body_path(digest)
+        if not body_path.exists():
+            _write_atomic(body_path, gzip.compress(body, mtime=0))
+        meta = {
+            'url': url,
+            'status': status,
+            'headers': {name: headers[name] for name in SAVED_HEADERS if headers.get(name) is not None},
+            'body': digest,
+            'saved': int(time.time()),
+        }
+        _write_atomic(self._url_path(url), json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        self.saved += 1
+
+    def stats(self) -> dict:
+        """ Число URL и тел в кэше и размер тел на диске """
+        urls = list((self.directory / 'urls').glob('*/*.json'))
+        bodies = list((self.directory / 'bodies').glob('*/*.gz'))
+        return {'urls': len(urls), 'bodies': len(bodies), 'bytes': sum(p.stat().st_size for p in bodies)}
+
+    def summary(self) -> str:
+        return f"кэш HTTP ({self.mode}): из кэша {self.hits}, нет в кэше {self.misses}, сохранено {self.saved}"
+
+
+_cache: HttpCache | None = None
+
+
+def configure(mode: str | None = None, directory: str | Path | None = None) -> HttpCache:
+    """ Задаёт режим и каталог общего кэша (по умолчанию — из HTTP_CACHE_MODE / HTTP_CACHE_DIR) """
+    global _cache
+    _cache = HttpCache(
+        mode or os.environ.get('HTTP_CACHE_MODE') or 'passthrough',
+        directory or os.environ.get('HTTP_CACHE_DIR') or DEFAULT_DIR,
+    )
+    return _cache
+
+
+def get_cache() -> HttpCache:
+    """ Общий для процесса кэш, при первом вызове настраивается из переменных окружения """
+    return _cache or configure()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Сводка по дисковому кэшу HTTP-ответов")
+    parser.add_argument('--dir', default=os.environ.get('HTTP_CACHE_DIR') or DEFAULT_DIR,
+                        help="Каталог кэша")
+    args = parser.parse_args()
+
+    stats = HttpCache(directory=args.dir).stats()
+    print(f"URL: {stats['urls']}, тел: {stats['bodies']}, на диске {stats['bytes'] / 2 ** 20:.2f} МБ")
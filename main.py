@@ -2,18 +2,35 @@
 Скрипт собирает rss ленту новостей с https://ru.investing.com/webmaster-tools/rss и помещает их в
 БД SQlite.
 Используется асинхронный парсинг для ускорения обработки нескольких RSS-лент.
+Путь записи (загрузка → парсинг → вставка) работает на кортежах без pandas,
+тяжёлые зависимости (aiohttp, requests, BeautifulSoup) импортируются только при первом использовании.
+С --store новости пишутся в хранилище, разбитое по месяцам (news_partitions), а состояние лент
+остаётся в основной БД.
 """
+from __future__ import annotations
 
 import asyncio
-import aiohttp
-import requests
-from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, AsyncIterator
 import sqlite3
 import time
+import calendar
+import re
 import os
+import threading
+import random
+from dataclasses import dataclass
+import hashlib
+from collections import Counter
+from operator import itemgetter
+import http_cache
+import news_partitions
+import sqlighter3_connect
+import sqlighter3_news
+
+if TYPE_CHECKING:
+    import aiohttp
 
 def print_blue(text: str) -> None:
     print(f"\033[94m{text}\033[0m")
@@ -24,53 +41,410 @@ def print_red(text: str) -> None:
 def print_green(text: str) -> None:
     print(f"\033[92m{text}\033[0m")
 
-async def fetch_rss(session: aiohttp.ClientSession, rss_link: str) -> list[dict]:
+CHUNK_SIZE = 16 * 1024  # Размер порции тела ответа для потокового парсинга
+news_store: news_partitions.NewsStore | None = None  # Хранилище по периодам (--store), иначе — основная БД
+
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+TZ_OFFSETS = {  # Смещения именованных зон RFC-822, минуты
+    'gmt': 0, 'ut': 0, 'utc': 0, 'z': 0,
+    'est': -300, 'edt': -240, 'cst': -360, 'cdt': -300,
+    'mst': -420, 'mdt': -360, 'pst': -480, 'pdt': -420,
+    'msk': 180,
+}
+RFC822_RE = re.compile(
+    r'(?:[A-Za-z]{3},?\s+)?(\d{1,2})\s+([A-Za-z]{3})[A-Za-z]*\s+(\d{2,4})\s+'
+    r'(\d{1,2}):(\d{2})(?::(\d{2}))?(?:\s+([+-]\d{4}|[A-Za-z]+))?'
+)
+
+
+def utc_timestamp(year: int, month: int, day: int, hour: int, minute: int, second: int) -> int | None:
+    """
+    Секунды unix для даты и времени UTC или None, если поля вне допустимых значений
+    (calendar.timegm их не проверяет: '2023-02-30' перешло бы на 2 марта).
+    """
+    if not (year >= 1 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+            and hour < 24 and minute < 60 and second < 60):
+        return None
+    return calendar.timegm((year, month, day, hour, minute, second))
+
+
+def parse_pub_date(pub_date: str | None) -> int | None:
+    """
+    Переводит pubDate ленты во время UTC в секундах unix.
+    Понимает 'YYYY-MM-DD HH:MM:SS' (так отдаёт investing.com, считается UTC) и
+    RFC-822 вида 'Tue, 18 Jul 2023 14:05:44 +0300' / '... GMT'.
+    Возвращает None, если дату разобрать не удалось или она не существует (31 февраля, 25:00).
+    """
+    if not pub_date:
+        return None
+    text = pub_date.strip()
+    # Быстрый путь: 'YYYY-MM-DD HH:MM:SS'
+    if len(text) == 19 and text[4] == '-' and text[7] == '-' and text[13] == ':' and text[16] == ':':
+        try:
+            return utc_timestamp(int(text[:4]), int(text[5:7]), int(text[8:10]),
+                                 int(text[11:13]), int(text[14:16]), int(text[17:19]))
+        except ValueError:
+            return None
+    match = RFC822_RE.match(text)
+    if match is None:
+        return None
+    day, month, year, hour, minute, second, zone = match.groups()
+    month_num = MONTHS.get(month.lower())
+    if month_num is None:
+        return None
+    year_num = int(year)
+    if year_num < 100:
+        year_num += 2000 if year_num < 50 else 1900
+    if zone and zone[0] in '+-':
+        offset = int(zone[1:3]) * 60 + int(zone[3:5])
+        if zone[0] == '-':
+            offset = -offset
+    else:
+        offset = TZ_OFFSETS.get((zone or 'gmt').lower(), 0)
+    epoch = utc_timestamp(year_num, month_num, int(day), int(hour), int(minute), int(second or 0))
+    return epoch - offset * 60 if epoch is not None else None
+
+
+class RssStreamParser:
     """
-    Асинхронно получает и парсит одну RSS-ленту, возвращает список новостей.
+    Инкрементальный парсер rss ленты поверх XMLPullParser.
+    Принимает тело ответа порциями и отдаёт новости компактными кортежами
+    (ts, section, title, link) по мере их появления. Обработанные item
+    удаляются из дерева, поэтому память не растёт с размером ленты.
+    Если задан stop_before (секунды unix), разбор прекращается на первой новости старше
+    этого времени (ленты отдают новости от новых к старым).
+    Попутно запоминает подсказки канала для планировщика: ttl (минуты) и skipHours (часы GMT).
     """
+
+    def __init__(self, stop_before: int | None = None) -> None:
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._stack: list[ET.Element] = []
+        self.stop_before = stop_before
+        self.channel_name = ""
+        self.ttl: int | None = None
+        self.skip_hours: list[int] = []
+        self.done = False
+
+    def feed(self, chunk: bytes) -> list[tuple]:
+        """
+        Передаёт парсеру очередную порцию и возвращает новости, которые в ней завершились.
+        """
+        if self.done:
+            return []
+        items = []
+        self._parser.feed(chunk)
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                self._stack.append(elem)
+                continue
+            self._stack.pop()
+            parent = self._stack[-1].tag if self._stack else None
+            if elem.tag == 'title' and parent == 'channel':
+                self.channel_name = elem.text or ""
+            elif elem.tag == 'ttl' and parent == 'channel' and (elem.text or "").strip().isdigit():
+                self.ttl = int(elem.text)
+            elif elem.tag == 'hour' and parent == 'skipHours' and (elem.text or "").strip().isdigit():
+                self.skip_hours.append(int(elem.text))
+            elif elem.tag == 'item':
+                fields = {child.tag: child.text for child in elem}
+                if self._stack:
+                    self._stack[-1].remove(elem)
+                elem.clear()
+                ts = parse_pub_date(fields.get('pubDate'))
+                if self.stop_before and ts and ts < self.stop_before:
+                    self.done = True
+                    break
+                items.append((
+                    ts,
+                    self.channel_name,
+                    fields.get('title') or "Нет заголовка",
+                    fields.get('link') or "Нет ссылки",
+                ))
+        return items
+
+
+async def read_rss_stream(chunks: AsyncIterator[bytes], state: dict) -> tuple[str, list[tuple]]:
+    """
+    Потоково разбирает тело rss ленты, одновременно считая хэш содержимого.
+    После ранней остановки парсера оставшееся тело только хэшируется.
+    Обновляет state (content_hash, last_pub, ttl, skip_hours). Возвращает статус и список новостей.
+    """
+    parser = RssStreamParser(stop_before=state.get("last_pub"))
+    digest = hashlib.sha1()
     news_items = []
-    try:
-        async with session.get(rss_link) as response:
-            xml_content = await response.text()
-            root = ET.fromstring(xml_content)
-            channel = root.find('.//channel')
-            channel_name = channel.find('title').text if channel is not None and channel.find('title') is not None else ""
-            # print(f'Обработка канала: {channel_name}')
-            for item in root.findall('.//item'):
-                title = item.find('title').text if item.find('title') is not None else "Нет заголовка"
-                pub_date = item.find('pubDate').text if item.find('pubDate') is not None else "Нет даты публикации"
-                link = item.find('link').text if item.find('link') is not None else "Нет ссылки"
-                news_items.append({
-                    "date": pub_date,
-                    "section": channel_name,
-                    "title": title,
-                    "link": link
-                })
-    except Exception as e:
-        print_red(f"Ошибка при парсинге {rss_link}: {e}")
-    return news_items
+    async for chunk in chunks:
+        digest.update(chunk)
+        news_items.extend(parser.feed(chunk))
+    content_hash = digest.hexdigest()
+    if content_hash == state.get("content_hash"):
+        return "unchanged", []
+    state["content_hash"] = content_hash
+    state["ttl"] = parser.ttl
+    state["skip_hours"] = ",".join(map(str, sorted(set(parser.skip_hours)))) or None
+    timestamps = [item[0] for item in news_items if item[0]]
+    if timestamps:
+        state["last_pub"] = max(timestamps + [state.get("last_pub") or 0])
+    return "changed", news_items
+
 
-async def async_parsing_news(rss_links: list[str]) -> pd.DataFrame:
+async def fetch_rss(session: aiohttp.ClientSession, rss_link: str,
+                    state: dict) -> tuple[str, list[tuple]]:
     """
-    Асинхронно парсит все RSS-ленты и возвращает DataFrame.
+    Асинхронно получает и потоково парсит одну RSS-ленту.
+    Отправляет условный GET по сохранённым ETag/Last-Modified и не парсит ленту,
+    если сервер ответил 304. Новости не возвращаются, если тело совпало с прошлым по хэшу.
+    Обновляет state на месте. Возвращает статус ('unchanged', 'changed')
+    и список новостей (ts, section, title, link). Ошибки сети и парсинга пробрасываются
+    вызывающему (повторы и учёт ошибок — в FeedFetcher).
     """
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_rss(session, link) for link in rss_links]
-        results = await asyncio.gather(*tasks)
-    # results — список списков словарей
-    all_news = [item for sublist in results for item in sublist]
-    df = pd.DataFrame(all_news, columns=["date", "section", "title", "link"])
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    return df
+    cache = http_cache.get_cache()
+    if cache.replay:  # Без сети: тело из кэша, повторное тело отсекается по хэшу
+        cached = cache.load(rss_link)
+        if cached is None:
+            raise LookupError(f"Нет в кэше HTTP: {rss_link}")
+        return await read_rss_stream(iter_bytes(cached.body), state)
+
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    async with session.get(rss_link, headers=headers) as response:
+        if response.status == 304:
+            return "unchanged", []
+        response.raise_for_status()
+        chunks = response.content.iter_chunked(CHUNK_SIZE)
+        body = [] if cache.record else None
+        status, news_items = await read_rss_stream(tee_chunks(chunks, body) if cache.record else chunks, state)
+        if cache.record:
+            cache.save(rss_link, response.status, response.headers, b"".join(body))
+        state["etag"] = response.headers.get("ETag")
+        state["last_modified"] = response.headers.get("Last-Modified")
+    return status, news_items
+
+
+async def iter_bytes(body: bytes) -> AsyncIterator[bytes]:
+    """
+    Тело из кэша порциями CHUNK_SIZE, как при чтении из сети.
+    """
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+async def tee_chunks(chunks: AsyncIterator[bytes], body: list[bytes]) -> AsyncIterator[bytes]:
+    """
+    Пропускает порции тела дальше, попутно собирая их в body (для записи в кэш).
+    """
+    async for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+
+
+@dataclass
+class FetchConfig:
+    """
+    Настройки сетевого слоя сборщика rss.
+    """
+    limit: int = 20  # Всего соединений в пуле
+    limit_per_host: int = 4  # Соединений на один хост
+    concurrency: int = 8  # Одновременно загружаемых лент
+    connect_timeout: float = 10  # Таймаут установки соединения, сек
+    request_timeout: float = 30  # Таймаут одного запроса целиком, сек
+    cycle_deadline: float = 120  # Сколько цикл ждёт ленты, остальные переходят в следующий цикл, сек
+    retries: int = 3  # Попыток на ленту за цикл
+    backoff_base: float = 1.0  # Базовая пауза перед повтором, сек (растёт экспоненциально)
+    backoff_max: float = 30.0  # Максимальная пауза перед повтором, сек
+    breaker_threshold: int = 3  # Циклов подряд с ошибкой до отключения ленты
+    breaker_cooldown: float = 900  # На сколько отключается лента, сек (удваивается при новых ошибках)
+    breaker_cooldown_max: float = 6 * 3600
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Стоит ли повторять запрос: сетевые ошибки, таймауты, 429 и 5xx.
+    """
+    import aiohttp
+
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class FeedFetcher:
+    """
+    Сетевой слой сборщика: общий пул соединений с лимитами на хост, ограничение
+    числа одновременно загружаемых лент, таймауты запроса и цикла, повторы с
+    экспоненциальной паузой со случайным разбросом и отключение (circuit breaker)
+    лент, которые раз за разом падают.
+    Ленты, не уложившиеся в дедлайн цикла, не отменяются: их результат забирается
+    в начале следующего цикла.
+    Загрузка меняет копию состояния ленты (ETag, хэш, last_pub); в feed_states она переносится
+    commit_states только после записи новостей цикла в БД.
+    """
+
+    def __init__(self, config: FetchConfig | None = None) -> None:
+        self.config = config or FetchConfig()
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore = asyncio.Semaphore(self.config.concurrency)
+        self._pending: dict[str, asyncio.Task] = {}
+        self._failures: dict[str, int] = {}
+        self._open_until: dict[str, float] = {}
+        self._staged: dict[str, dict] = {}
+
+    async def __aenter__(self) -> FeedFetcher:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.config.request_timeout,
+            sock_connect=self.config.connect_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        for task in self._pending.values():
+            task.cancel()
+        await asyncio.gather(*self._pending.values(), return_exceptions=True)
+        self._pending.clear()
+        await self._session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _fetch(self, rss_link: str, state: dict) -> tuple[str, list[tuple]]:
+        """
+        Загружает ленту с повторами. Ошибка после последней попытки — статус 'failed'.
+        """
+        async with self._semaphore:
+            for attempt in range(self.config.retries):
+                try:
+                    result = await fetch_rss(self._session, rss_link, state)
+                except Exception as e:
+                    if attempt < self.config.retries - 1 and is_retryable(e):
+                        await asyncio.sleep(self._backoff(attempt))
+                        continue
+                    print_red(f"Ошибка при парсинге {rss_link}: {type(e).__name__} {e}")
+                    self._record_failure(rss_link)
+                    return "failed", []
+                self._failures.pop(rss_link, None)
+                self._open_until.pop(rss_link, None)
+                return result
+        return "failed", []
+
+    def _record_failure(self, rss_link: str) -> None:
+        failures = self._failures.get(rss_link, 0) + 1
+        self._failures[rss_link] = failures
+        if failures >= self.config.breaker_threshold:
+            cooldown = min(self.config.breaker_cooldown_max,
+                           self.config.breaker_cooldown * 2 ** (failures - self.config.breaker_threshold))
+            self._open_until[rss_link] = time.monotonic() + cooldown
+            print_red(f"Лента {rss_link} отключена на {cooldown / 60:.0f} мин после {failures} ошибок подряд")
+
+    def is_open(self, rss_link: str) -> bool:
+        """
+        Отключена ли лента (circuit breaker разомкнут).
+        """
+        return time.monotonic() < self._open_until.get(rss_link, 0.0)
+
+    async def run_cycle(self, rss_links: list[str],
+                        feed_states: dict[str, dict]) -> dict[str, tuple[str, list[tuple]]]:
+        """
+        Один цикл загрузки. Возвращает {лента: (статус, новости)}, статусы:
+        unchanged, changed, failed, а также skipped (лента отключена) и
+        deferred (не уложилась в дедлайн, результат будет в следующем цикле).
+        Результаты отложенных с прошлого цикла лент тоже попадают в этот цикл,
+        такие ленты повторно не запрашиваются.
+        """
+        results = {}
+        for rss_link, task in list(self._pending.items()):
+            if task.done():
+                del self._pending[rss_link]
+                results[rss_link] = task.result()
+
+        tasks = {}
+        for rss_link in rss_links:
+            if rss_link in results:
+                continue
+            if rss_link in self._pending:
+                results[rss_link] = ("deferred", [])
+            elif self.is_open(rss_link):
+                results[rss_link] = ("skipped", [])
+            else:
+                staged = self._staged[rss_link] = dict(feed_states.get(rss_link, {}))
+                tasks[rss_link] = asyncio.create_task(self._fetch(rss_link, staged))
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=self.config.cycle_deadline)
+        for rss_link, task in tasks.items():
+            if task.done():
+                results[rss_link] = task.result()
+            else:
+                self._pending[rss_link] = task
+                results[rss_link] = ("deferred", [])
+        return results
+
+    def commit_states(self, results: dict[str, tuple[str, list[tuple]]],
+                      feed_states: dict[str, dict], saved: bool = True) -> None:
+        """
+        Переносит в feed_states состояние загрузки лент цикла (FETCH_STATE_KEYS). saved=False —
+        новости цикла не записаны: состояние отбрасывается, и ленты будут загружены заново.
+        Состояние отложенных лент остаётся до цикла, в котором придёт их результат.
+        """
+        for rss_link, (status, _) in results.items():
+            if status in ("deferred", "skipped"):
+                continue
+            staged = self._staged.pop(rss_link, None)
+            if saved and staged is not None and status in ("changed", "unchanged"):
+                state = feed_states.setdefault(rss_link, {})
+                state.update({key: staged.get(key) for key in FETCH_STATE_KEYS})
+
+FETCH_STATE_KEYS = ("etag", "last_modified", "content_hash", "last_pub", "ttl", "skip_hours")
+
+
+def collect_news(results: dict[str, tuple[str, list[tuple]]]) -> list[tuple]:
+    """
+    Собирает новости всех лент цикла в один список, отсортированный по дате.
+    Новости без распознанной даты отбрасываются.
+    """
+    all_news = [item for _, items in results.values() for item in items if item[0]]
+    all_news.sort(key=itemgetter(0))
+    return all_news
 
 def get_links(url: str) -> list[str]:
     """
     Получение ссылок на новостные rss
     """
+    import requests
+    from bs4 import BeautifulSoup
+
+    cache = http_cache.get_cache()
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        if cache.replay:
+            cached = cache.load(url)
+            if cached is None:
+                print_red(f"Нет в кэше HTTP: {url}")
+                return []
+            text = cached.body.decode('utf-8', errors='replace')
+        else:
+            response = requests.get(url)
+            response.raise_for_status()
+            if cache.record:
+                cache.save(url, response.status_code, response.headers, response.content)
+            text = response.text
+        soup = BeautifulSoup(text, 'html.parser')
         news_section = soup.find('h2', string='Новости')
         if news_section:
             rss_column = news_section.find_parent('div', class_='rssColumn halfSizeColumn float_lang_base_2')
@@ -94,92 +468,274 @@ def get_links(url: str) -> list[str]:
         print_red(f"Ошибка при получении ссылок: {e}")
     return []
 
-def parsing_news(rss_links: list[str]) -> pd.DataFrame:
+def open_news_db(db_path: str) -> sqlite3.Connection:
     """
-    Обёртка для асинхронного парсинга, чтобы вызывать из синхронного кода.
+    Общее соединение с БД новостей (WAL, одно на процесс), таблицы создаются при первом обращении.
     """
-    return asyncio.run(async_parsing_news(rss_links))
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlighter3_connect.get_connection(db_path)
+    sqlighter3_news.create_tables(connection)
+    return connection
 
-def save_to_sqlite(df: pd.DataFrame, db_path: str) -> None:
+class FeedDirectory:
     """
-    Сохраняет DataFrame c rss лентой новостей в SQLite базу данных.
+    Список rss лент со страницы webmaster-tools, закэшированный в БД новостей.
+    Устаревший (старше ttl_sec) список обновляется в фоновом потоке, цикл сбора
+    сразу получает последний удачный список. При ошибке обновления продолжает
+    использоваться старый список.
     """
-    if df.empty:
-        print_red("DataFrame пустой, нечего сохранять в БД.")
-        return
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    with sqlite3.connect(db_path) as conn:
+
+    def __init__(self, url: str, db_path: str, ttl_sec: int = 24 * 3600) -> None:
+        self.url = url
+        self.db_path = db_path
+        self.ttl_sec = ttl_sec
+        self._links: list[str] = []
+        self._updated_at = 0.0
+        self._refresh_thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        if os.path.exists(db_path):
+            try:
+                self._links, self._updated_at = sqlighter3_news.get_feed_directory(open_news_db(db_path))
+            except Exception as e:
+                print_red(f"Ошибка при чтении кэша rss лент из БД: {e}")
+
+    def links(self) -> list[str]:
+        """
+        Возвращает список rss лент. Если кэша нет — загружает его синхронно,
+        если кэш устарел — запускает фоновое обновление.
+        """
+        if not self._links:
+            self.refresh()
+        elif time.time() - self._updated_at > self.ttl_sec:
+            with self._lock:
+                if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                    self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+                    self._refresh_thread.start()
+        return self._links
+
+    def refresh(self) -> None:
+        """
+        Загружает список rss лент со страницы и сохраняет его в БД.
+        """
+        links = get_links(self.url)
+        if not links:
+            print_red("Не удалось обновить список rss лент, используется сохранённый.")
+            return
+        updated_at = time.time()
         try:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS news (
-                    date TEXT,
-                    title TEXT
-                )
-            """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_news_date_title ON news(date, title)")
-            df[["date", "title"]].to_sql('news', conn, if_exists='append', index=False)
+            sqlighter3_news.save_feed_directory(open_news_db(self.db_path), links, updated_at)
         except Exception as e:
-            print_red(f"Ошибка при сохранении в БД: {e}")
+            print_red(f"Ошибка при сохранении кэша rss лент в БД: {e}")
+        self._links, self._updated_at = links, updated_at
+        print_blue(f"Список rss лент обновлён: {len(links)}")
 
-def remove_duplicates_from_db(db_path: str) -> None:
+def save_to_sqlite(news: list[tuple], db_path: str) -> int | None:
     """
-    Удаляет дубликаты из таблицы news по дате (без времени) и title, оставляя одну запись.
-    Выводит количество удалённых строк и выполняет VACUUM.
+    Сохраняет новости (ts, section, title, link) в SQLite базу данных одной транзакцией.
+    Дубликаты (тот же день и заголовок) отсекаются при вставке.
+    Возвращает количество новых строк, None — ошибка записи (состояние лент тогда не сохраняется).
     """
+    if not news:
+        print_red("Новостей нет, нечего сохранять в БД.")
+        return 0
+    rows = [(ts, section, title) for ts, section, title, _ in news]
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.execute("SELECT COUNT(*) FROM news")
-            before_count = cursor.fetchone()[0]
-            conn.execute("""
-                DELETE FROM news
-                WHERE rowid NOT IN (
-                    SELECT rowid
-                    FROM (
-                        SELECT
-                            rowid,
-                            DATE(date) AS news_date,
-                            title,
-                            ROW_NUMBER() OVER (PARTITION BY DATE(date), title ORDER BY date ASC) AS rn
-                        FROM news
-                    ) AS subquery
-                    WHERE rn = 1
-                );
-            """)
-            cursor = conn.execute("SELECT COUNT(*) FROM news")
-            after_count = cursor.fetchone()[0]
-            deleted_count = before_count - after_count
-            print_green(f"Дубликаты в базе данных удалены. Удалено строк: {deleted_count}")
+        if news_store is not None:
+            added = news_store.add_news(rows)
+            if news_store.skipped:
+                print_red(f"Новостей для закрытых частей хранилища (не записаны): {news_store.skipped}")
+                news_store.skipped = 0
+            return added
+        return sqlighter3_news.add_news(open_news_db(db_path), rows)
     except Exception as e:
-        print_red(f"Ошибка при удалении дубликатов из БД: {e}")
+        print_red(f"Ошибка при сохранении в БД: {e}")
+    return None
 
+def load_feed_states(db_path: str) -> dict[str, dict]:
+    """
+    Загружает состояние rss лент (ETag, Last-Modified, хэш содержимого) из БД.
+    """
+    if not os.path.exists(db_path):
+        return {}
+    try:
+        return sqlighter3_news.get_feed_states(open_news_db(db_path))
+    except Exception as e:
+        print_red(f"Ошибка при чтении состояния лент из БД: {e}")
+    return {}
+
+def store_feed_states(feed_states: dict[str, dict], db_path: str) -> None:
+    """
+    Сохраняет состояние rss лент в БД.
+    """
     try:
-        with sqlite3.connect(db_path) as conn:
-            conn.isolation_level = None
-            conn.execute("VACUUM")
-            print_green("VACUUM выполнен: база данных оптимизирована.")
+        sqlighter3_news.save_feed_states(open_news_db(db_path), feed_states)
     except Exception as e:
-        print_red(f"Ошибка при выполнении VACUUM: {e}")
+        print_red(f"Ошибка при сохранении состояния лент в БД: {e}")
 
-def main(url: str, db_path: str) -> None:
-    rss_links = get_links(url)
+async def collect(fetcher: FeedFetcher, feed_directory: FeedDirectory, db_path: str,
+                  feed_states: dict[str, dict]) -> int:
+    """
+    Один цикл сбора: загрузка лент, сохранение новых новостей и состояния лент.
+    feed_states живёт между циклами, чтобы отложенные загрузки обновляли то же состояние.
+    Состояние лент сдвигается только после записи их новостей в БД.
+    Возвращает количество новых строк.
+    """
+    rss_links = feed_directory.links()
     if not rss_links:
         print_red("Не удалось получить ссылки на RSS ленты.")
-        return
-    print_blue('Ссылки на RSS ленты получены')
-    df = parsing_news(rss_links)
-    df = df.sort_values(by='date')  # Сортировка по date в ascending order
-    save_to_sqlite(df, db_path)
-    print_green(f"Новости сохранены в базе данных. Сохранено строк: {len(df)}")
-    remove_duplicates_from_db(db_path)
+        return 0
+    results = await fetcher.run_cycle(rss_links, feed_states)
+    news, stats = collect_news(results), Counter(status for status, _ in results.values())
+    print_blue(f"Ленты: без изменений {stats['unchanged']}, изменились {stats['changed']}, "
+               f"ошибки {stats['failed']}, отключены {stats['skipped']}, отложены {stats['deferred']}")
+    new_count = save_to_sqlite(news, db_path)
+    fetcher.commit_states(results, feed_states, saved=new_count is not None)
+    if new_count is None:
+        return 0
+    print_green(f"Новости сохранены в базе данных. Получено строк: {len(news)}, новых: {new_count}")
+    store_feed_states(feed_states, db_path)
+    return new_count
+
+@dataclass
+class ScheduleConfig:
+    """
+    Настройки адаптивного опроса лент.
+    """
+    min_interval: float = 60  # Минимальный интервал опроса ленты, сек
+    max_interval: float = 3600  # Максимальный интервал опроса ленты, сек
+    initial_interval: float = 300  # Интервал для новой ленты, сек
+    speedup: float = 0.5  # Множитель интервала, если в ленте появились новости
+    slowdown: float = 1.5  # Множитель интервала, если новостей нет
+    max_sleep: float = 60  # Максимальная пауза планировщика, чтобы подхватывать новые ленты, сек
+
+
+def next_poll(state: dict, new_count: int, now: float, config: ScheduleConfig) -> None:
+    """
+    Пересчитывает интервал и время следующего опроса ленты (poll_interval, next_due в state).
+    Интервал сокращается, когда в ленте появляются новости, и растёт, когда их нет,
+    в пределах [min_interval, max_interval]. Подсказка <ttl> поднимает нижнюю границу,
+    часы из <skipHours> (GMT) пропускаются.
+    """
+    interval = state.get("poll_interval") or config.initial_interval
+    interval *= config.speedup if new_count else config.slowdown
+    low = config.min_interval
+    if state.get("ttl"):
+        low = min(config.max_interval, max(low, state["ttl"] * 60))
+    interval = min(config.max_interval, max(low, interval))
+    next_due = now + interval
+    skip_hours = {int(hour) for hour in (state.get("skip_hours") or "").split(",") if hour}
+    if len(skip_hours) < 24:
+        while datetime.fromtimestamp(next_due, timezone.utc).hour in skip_hours:
+            next_due = (next_due // 3600 + 1) * 3600  # Начало следующего часа
+    state["poll_interval"] = interval
+    state["next_due"] = next_due
+
+
+class FeedScheduler:
+    """
+    Долгоживущий планировщик опроса лент. У каждой ленты своё время следующего
+    опроса (next_due), интервал подстраивается под частоту появления новостей.
+    Расписание хранится в таблице feeds вместе с остальным состоянием лент,
+    поэтому после перезапуска опрос продолжается с того же места.
+    """
+
+    def __init__(self, fetcher: FeedFetcher, feed_directory: FeedDirectory, db_path: str,
+                 config: ScheduleConfig | None = None) -> None:
+        self.fetcher = fetcher
+        self.feed_directory = feed_directory
+        self.db_path = db_path
+        self.config = config or ScheduleConfig()
+        self.feed_states = load_feed_states(db_path)
+
+    def due_links(self, rss_links: list[str], now: float) -> list[str]:
+        """
+        Ленты, время опроса которых наступило (новые ленты — сразу).
+        """
+        return [link for link in rss_links
+                if (self.feed_states.get(link, {}).get("next_due") or 0) <= now]
+
+    async def poll(self, rss_links: list[str]) -> int:
+        """
+        Опрашивает переданные ленты, сохраняет новости и новое расписание.
+        Если новости не записались, состояние лент не сдвигается и они опрашиваются снова
+        через min_interval. Возвращает количество новых строк.
+        """
+        last_pubs = {link: self.feed_states.get(link, {}).get("last_pub") or 0 for link in rss_links}
+        results = await self.fetcher.run_cycle(rss_links, self.feed_states)
+        stats = Counter(status for status, _ in results.values())
+        new_count = save_to_sqlite(collect_news(results), self.db_path) if stats['changed'] else 0
+        self.fetcher.commit_states(results, self.feed_states, saved=new_count is not None)
+        now = time.time()
+        for link, (status, items) in results.items():
+            if status == "deferred" or new_count is None:
+                # Результат заберёт один из следующих циклов (или повтор после ошибки записи), интервал не меняем
+                self.feed_states.setdefault(link, {})["next_due"] = now + self.config.min_interval
+                continue
+            last_pub = last_pubs.get(link, 0)
+            link_new = sum(1 for item in items if item[0] and item[0] > last_pub)
+            next_poll(self.feed_states.setdefault(link, {}), link_new, now, self.config)
+        if new_count is None:
+            return 0
+        store_feed_states(self.feed_states, self.db_path)
+        print_blue(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} Ленты: опрошено {len(results)}, "
+                   f"без изменений {stats['unchanged']}, изменились {stats['changed']}, "
+                   f"ошибки {stats['failed']}, отключены {stats['skipped']}, отложены {stats['deferred']}; "
+                   f"новых строк: {new_count}")
+        return new_count
+
+    async def run_forever(self) -> None:
+        """
+        Бесконечный цикл: опрашивает ленты по мере наступления их next_due и спит до ближайшего.
+        """
+        while True:
+            rss_links = self.feed_directory.links()
+            now = time.time()
+            due = self.due_links(rss_links, now)
+            if due:
+                await self.poll(due)
+            pending = [self.feed_states.get(link, {}).get("next_due") or 0 for link in rss_links]
+            sleep_sec = min(pending, default=now + self.config.max_sleep) - time.time()
+            await asyncio.sleep(min(self.config.max_sleep, max(1.0, sleep_sec)))
+
+def main(feed_directory: FeedDirectory, db_path: str, config: FetchConfig | None = None) -> int:
+    """
+    Разовый цикл сбора из синхронного кода.
+    """
+    async def run() -> int:
+        async with FeedFetcher(config) as fetcher:
+            return await collect(fetcher, feed_directory, db_path, load_feed_states(db_path))
+
+    return asyncio.run(run())
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Сбор rss лент investing.com в БД новостей")
+    parser.add_argument('--http-cache', choices=http_cache.MODES,
+                        help="Кэш ответов: record — сохранять, replay — один цикл сбора из кэша без сети "
+                             "(по умолчанию HTTP_CACHE_MODE или passthrough)")
+    parser.add_argument('--store', help="Каталог хранилища новостей по периодам (news_partitions)")
+    parser.add_argument('--period', choices=tuple(news_partitions.PERIODS), default='month',
+                        help="Период частей хранилища")
+    args = parser.parse_args()
+    response_cache = http_cache.configure(args.http_cache)
+    if args.store:
+        news_store = news_partitions.NewsStore(args.store, args.period)
+
     URL = "https://ru.investing.com/webmaster-tools/rss"
     db_path = r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db'
-    # interval_sec = 3600  # 1 час
-    interval_sec = 300  # 5 минут
-
-    while True:
-        print_blue(f"\nЗапуск сбора данных: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        main(URL, db_path)
-        print_blue(f"Ожидание {interval_sec // 60} минут до следующего запуска...\n")
-        time.sleep(interval_sec)
+    feed_directory_ttl_sec = 24 * 3600  # Список rss лент обновляется раз в сутки
+    feed_directory = FeedDirectory(URL, db_path, feed_directory_ttl_sec)
+    fetch_config = FetchConfig()
+    schedule_config = ScheduleConfig(min_interval=60, max_interval=3600, initial_interval=300)
+
+    if response_cache.replay:  # Повторная обработка сохранённых ответов: один цикл по всем лентам
+        print_green(f"Новых строк: {main(feed_directory, db_path, fetch_config)}")
+        print_blue(response_cache.summary())
+        raise SystemExit
+
+    async def run() -> None:
+        async with FeedFetcher(fetch_config) as fetcher:
+            await FeedScheduler(fetcher, feed_directory, db_path, schedule_config).run_forever()
+
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+"""
+Перевод БД новостей старой схемы (date TEXT, title TEXT) на компактную схему sqlighter3_news:
+время в секундах unix, день, 64-битный хэш заголовка с узким уникальным индексом, справочник разделов.
+Строки копируются пакетами, прерванную миграцию можно продолжить повторным запуском.
+До и после выводится размер БД и её таблиц/индексов, а также число строк, которые не перенесены
+(дубликаты и строки с пустой или нераспознанной датой или пустым заголовком).
+"""
+from pathlib import Path
+import argparse
+import sqlite3
+import sqlighter3_connect
+import sqlighter3_news
+
+
+def db_size_report(connection: sqlite3.Connection) -> dict[str, int]:
+    """
+    Размеры таблиц и индексов в байтах (через виртуальную таблицу dbstat, если она доступна)
+    плюс '<file>' — размер файла и '<free>' — размер свободных страниц.
+    """
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    report = {'<file>': page_size * page_count, '<free>': page_size * freelist_count}
+    try:
+        rows = connection.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    except sqlite3.OperationalError:
+        return report  # SQLite собран без dbstat
+    report.update(rows)
+    return report
+
+
+def print_report(title: str, report: dict[str, int]) -> None:
+    """ Печатает размеры, крупные объекты первыми """
+    print(title)
+    for name, size in sorted(report.items(), key=lambda item: -item[1]):
+        print(f"    {name:<30} {size / 2 ** 20:10.2f} МБ")
+
+
+def migrate(db_path: Path, batch_size: int, vacuum: bool) -> None:
+    """ Переводит БД на текущую схему и выводит размеры до и после """
+    connection = sqlighter3_connect.get_connection(db_path)
+    version = sqlighter3_news.get_schema_version(connection)
+    print(f"Версия схемы: {version}, текущая: {sqlighter3_news.SCHEMA_VERSION}")
+    print_report("До миграции:", db_size_report(connection))
+
+    if 'ts' not in sqlighter3_news.table_columns(connection, 'news'):
+        stats = sqlighter3_news.migrate_news(
+            connection, batch_size,
+            progress=lambda done, total: print(f"Перенесено до rowid {done} из {total}")
+        )
+        print(f"Строк в старой таблице: {stats['rows']}, перенесено: {stats['copied']}, "
+              f"дубликатов: {stats['duplicates']}, пропущено без даты или заголовка: {stats['invalid']}")
+    sqlighter3_news.create_tables(connection)
+    stats = sqlighter3_connect.reclaim_space(connection, force_full=vacuum)
+    print(f"Освобождение места: {sqlighter3_connect.format_stats(stats)}")
+
+    print_report("После миграции:", db_size_report(connection))
+    count = connection.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+    print(f"Строк в news: {count}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Миграция БД новостей на компактную схему")
+    parser.add_argument('--db', default=r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db',
+                        help="Путь к БД новостей")
+    parser.add_argument('--batch-size', type=int, default=50000, help="Строк в одном пакете")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="Выполнить полный VACUUM после миграции (иначе — только выше порога свободного места)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print("Ошибка: Файл базы данных новостей не найден.")
+        exit()
+
+    migrate(Path(args.db), args.batch_size, args.vacuum)
@@ -0,0 +1,221 @@
+"""
+Поиск почти-дубликатов заголовков (одна новость, перепечатанная разными лентами с небольшими
+изменениями формулировки) через MinHash и LSH-индекс в БД новостей.
+
+Для заголовка считается MinHash-подпись по множеству основ слов (NUM_PERM значений, на чистом Python:
+модуль вызывается при каждой записи новостей, и сборщику не нужен numpy), подпись
+режется на NUM_BANDS полос по BAND_ROWS значений, хэш полосы — ключ корзины в news_lsh.
+Кандидаты для новой новости — только новости из тех же корзин за соседние дни (без попарного
+сравнения со всей таблицей), совпадение подтверждается точным коэффициентом Жаккара.
+Таблицы:
+    news_lsh       — key (ключ корзины), day, news_id: корзины представителей кластеров
+                     за последние LSH_RETENTION_DAYS дней (старые удаляются, стоимость не растёт с БД).
+    news_dups      — id почти-дубликата и cluster_id — id представителя (первой новости кластера).
+                     Представители в таблицу не попадают.
+    near_dup_state — last_id: до какого id новости уже разобраны.
+    news_unique    — представление: news без почти-дубликатов (по одной новости на кластер).
+Новые новости разбираются в sqlighter3_news.add_news. После обновления схемы история не размечена,
+разметка всей таблицы заново:
+    python near_duplicates.py --db path/to/rss_news_investing.db --rebuild
+"""
+from hashlib import blake2b
+from pathlib import Path
+from typing import Callable
+import argparse
+import re
+import sqlite3
+import struct
+import sqlighter3_connect
+
+NUM_BANDS = 10  # Полос подписи (ключей корзин на заголовок)
+BAND_ROWS = 3  # Значений MinHash в полосе
+NUM_PERM = NUM_BANDS * BAND_ROWS
+JACCARD_THRESHOLD = 0.7  # Порог сходства множеств основ: замена одного слова из 10 — дубликат, другое число — нет
+STEM_LEN = 6  # Слова обрезаются до основы этой длины (числа и слова с цифрами — нет)
+WINDOW_DAYS = 1  # Кандидаты — новости того же дня и соседних дней
+LSH_RETENTION_DAYS = 7  # Сколько дней корзины хранятся в news_lsh
+BATCH_SIZE = 5000  # Новостей за один проход при разметке истории
+
+# Параметры хэш-функций MinHash: h_i(x) = (a_i * x + b_i) mod 2^64, старшие 32 бита
+_MASK64 = 2 ** 64 - 1
+_PARAMS = [
+    (int.from_bytes(blake2b(b'a%d' % i, digest_size=8).digest(), 'little') | 1,
+     int.from_bytes(blake2b(b'b%d' % i, digest_size=8).digest(), 'little'))
+    for i in range(NUM_PERM)
+]
+_BAND = struct.Struct(f'<{BAND_ROWS}I')
+
+
+def features(title: str) -> frozenset[str]:
+    """ Множество основ слов заголовка: нижний регистр, ё -> е, слова из букв обрезаны до STEM_LEN """
+    words = re.findall(r'\w+', title.lower().replace('ё', 'е'))
+    return frozenset(word[:STEM_LEN] if word.isalpha() else word for word in words if len(word) > 1 or word.isdigit())
+
+
+def minhash(feats: frozenset[str]) -> list[int]:
+    """ MinHash-подпись множества: NUM_PERM 32-битных значений """
+    x = [int.from_bytes(blake2b(f.encode('utf-8'), digest_size=8).digest(), 'little') for f in feats]
+    return [min(((v * a + b) & _MASK64) >> 32 for v in x) for a, b in _PARAMS]
+
+
+def band_keys(signature: list[int]) -> list[int]:
+    """ Ключи корзин LSH (знаковые 64-битные, номер полосы входит в хэш) """
+    return [
+        int.from_bytes(blake2b(bytes([band]) + _BAND.pack(*signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]),
+                               digest_size=8).digest(), 'little', signed=True)
+        for band in range(NUM_BANDS)
+    ]
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def create_tables(connection: sqlite3.Connection) -> None:
+    """
+    Создаёт таблицы почти-дубликатов и представление news_unique (вызывается из
+    sqlighter3_news.create_tables внутри её транзакции). В уже заполненной БД разметка
+    начинается с новостей, добавленных после создания таблиц.
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS news_lsh (
+            key INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            news_id INTEGER NOT NULL,
+            PRIMARY KEY (key, day, news_id)
+        ) WITHOUT ROWID
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_news_lsh_day ON news_lsh(day)")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS news_dups (
+            id INTEGER PRIMARY KEY,
+            cluster_id INTEGER NOT NULL
+        )
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_news_dups_cluster ON news_dups(cluster_id)")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS near_dup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            last_id INTEGER NOT NULL
+        )
+    """)
+    connection.execute(
+        "INSERT OR IGNORE INTO near_dup_state (id, last_id) SELECT 0, COALESCE(MAX(id), 0) FROM news")
+    # Удалённая новость уходит из кластера; удалённый представитель распускает свой кластер
+    connection.execute("""
+        CREATE TRIGGER IF NOT EXISTS news_dups_ad AFTER DELETE ON news BEGIN
+            DELETE FROM news_dups WHERE id = old.id OR cluster_id = old.id;
+        END
+    """)
+    connection.execute("""
+        CREATE VIEW IF NOT EXISTS news_unique AS
+        SELECT * FROM news WHERE NOT EXISTS (SELECT 1 FROM news_dups d WHERE d.id = news.id)
+    """)
+
+
+def cluster_new_news(connection: sqlite3.Connection, limit: int | None = None) -> dict[str, int]:
+    """
+    Разбирает новости с id после near_dup_state.last_id (не больше limit) в порядке id:
+    новость, похожая на представителя кластера за соседние дни (Жаккар >= JACCARD_THRESHOLD),
+    записывается в news_dups, иначе сама становится представителем и её корзины — в news_lsh.
+    Транзакцией управляет вызывающий. Возвращает число разобранных новостей, найденных
+    почти-дубликатов и проверенных кандидатов.
+    """
+    last_id = connection.execute("SELECT last_id FROM near_dup_state").fetchone()[0]
+    query = "SELECT id, day, title FROM news WHERE id > ? ORDER BY id"
+    rows = connection.execute(query + (f" LIMIT {int(limit)}" if limit else ""), (last_id,)).fetchall()
+    stats = {'processed': len(rows), 'duplicates': 0, 'candidates': 0}
+    if not rows:
+        return stats
+
+    lookup = f"""
+        SELECT id, title FROM news
+        WHERE id IN (
+            SELECT news_id FROM news_lsh
+            WHERE key IN ({', '.join('?' * NUM_BANDS)}) AND day BETWEEN ? AND ?
+        )
+    """
+    for news_id, day, title in rows:
+        feats = features(title)
+        if not feats:
+            continue
+        keys = band_keys(minhash(feats))
+        candidates = connection.execute(lookup, (*keys, day - WINDOW_DAYS, day + WINDOW_DAYS)).fetchall()
+        stats['candidates'] += len(candidates)
+        best, best_score = None, JACCARD_THRESHOLD
+        for cluster_id, cluster_title in candidates:  # В корзинах только представители кластеров
+            score = jaccard(feats, features(cluster_title))
+            if score > best_score or (score == best_score and (best is None or cluster_id < best)):
+                best, best_score = cluster_id, score
+        if best is not None:
+            connection.execute("INSERT OR REPLACE INTO news_dups (id, cluster_id) VALUES (?, ?)", (news_id, best))
+            stats['duplicates'] += 1
+        else:
+            connection.executemany("INSERT OR IGNORE INTO news_lsh (key, day, news_id) VALUES (?, ?, ?)",
+                                   ((key, day, news_id) for key in keys))
+
+    connection.execute("UPDATE near_dup_state SET last_id = ?", (rows[-1][0],))
+    max_day = max(day for _, day, _ in rows)
+    connection.execute("DELETE FROM news_lsh WHERE day < ?", (max_day - LSH_RETENTION_DAYS,))
+    return stats
+
+
+def rebuild(connection: sqlite3.Connection, batch_size: int = BATCH_SIZE,
+            progress: Callable[[dict[str, int], int], None] | None = None) -> dict[str, int]:
+    """
+    Размечает всю таблицу news заново пакетами по batch_size (каждый пакет — своя транзакция).
+    progress(накопленная статистика, всего новостей) вызывается после каждого пакета.
+    """
+    with connection:
+        connection.execute("DELETE FROM news_lsh")
+        connection.execute("DELETE FROM news_dups")
+        connection.execute("UPDATE near_dup_state SET last_id = 0")
+    total = connection.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+    totals = {'processed': 0, 'duplicates': 0, 'candidates': 0}
+    while True:
+        with connection:
+            stats = cluster_new_news(connection, batch_size)
+        if not stats['processed']:
+            return totals
+        for key, value in stats.items():
+            totals[key] += value
+        if progress:
+            progress(totals, total)
+
+
+def largest_clusters(connection: sqlite3.Connection, limit: int = 10) -> list[tuple[int, int, str]]:
+    """ Крупнейшие кластеры: (id представителя, число новостей с представителем, заголовок) """
+    return connection.execute("""
+        SELECT d.cluster_id, COUNT(*) + 1 AS size, n.title
+        FROM news_dups d JOIN news n ON n.id = d.cluster_id
+        GROUP BY d.cluster_id
+        ORDER BY size DESC, d.cluster_id
+        LIMIT ?
+    """, (limit,)).fetchall()
+
+
+if __name__ == '__main__':  # Разметка истории и сводка по почти-дубликатам
+    import sqlighter3_news
+
+    parser = argparse.ArgumentParser(description="Почти-дубликаты заголовков в БД новостей")
+    parser.add_argument('--db', default=r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db',
+                        help="Путь к БД новостей")
+    parser.add_argument('--rebuild', action='store_true', help="Разметить всю таблицу news заново")
+    parser.add_argument('--top', type=int, default=10, help="Сколько крупнейших кластеров вывести")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print("Ошибка: Файл базы данных новостей не найден.")
+        exit()
+
+    connection = sqlighter3_connect.get_connection(args.db)
+    sqlighter3_news.create_tables(connection)
+    if args.rebuild:
+        rebuild(connection, progress=lambda stats, total: print(
+            f"Разобрано {stats['processed']} из {total}, почти-дубликатов: {stats['duplicates']}"))
+    news_count, dups_count, last_id = connection.execute("""
+        SELECT (SELECT COUNT(*) FROM news), (SELECT COUNT(*) FROM news_dups), (SELECT last_id FROM near_dup_state)
+    """).fetchone()
+    print(f"Новостей: {news_count}, почти-дубликатов: {dups_count}, разобраны до id {last_id}")
+    for cluster_id, size, title in largest_clusters(connection, args.top):
+        print(f"{size:5d}  {title}")
@@ -0,0 +1,339 @@
+"""
+Хранилище новостей, разбитое по времени на отдельные БД SQLite (по умолчанию помесячно, --period year —
+по годам). Каждая часть — обычная БД новостей схемы sqlighter3_news (FTS, почти-дубликаты, привязка
+к свечам работают внутри части), поэтому удаления, очистка дубликатов, VACUUM и резервные копии
+касаются только текущей части, а не всей истории.
+
+Файлы частей в каталоге хранилища (состояние видно по имени):
+    news_2025-06.db            — открытая часть, в неё пишутся новости этого периода (UTC);
+    news_2025-05.sealed.db     — закрытая: WAL сброшен, VACUUM, файл только для чтения;
+    news_2025-04.sealed.db.gz  — закрытая и сжатая; при чтении распаковывается в .cache/.
+Запись (NewsStore.add_news) раскладывает строки по частям по времени новости; ключ дедупликации
+(день + заголовок) целиком лежит в одной части. Чтение: connect_range подключает (ATTACH) только
+части, пересекающиеся с диапазоном, и даёт над ними временные представления news и news_unique;
+iter_news читает длинные диапазоны по частям без ATTACH. Соединения на запись держатся открытыми
+только для части текущего периода, поэтому прошлые части можно закрывать при работающем сборщике.
+
+Выгрузки, поиск и колоночная копия работают с одной БД новостей (id сквозные по всей истории);
+для них хранилище собирается в одну БД (повторный запуск читает только последние дни и дописывает
+новые строки); выгрузка в markdown может читать хранилище и напрямую (save_md_file_news_02.py --store):
+    python news_partitions.py --dir path/to/news_store --import path/to/rss_news_investing.db
+    python news_partitions.py --dir path/to/news_store --export path/to/rss_news_investing.db
+    python news_partitions.py --dir path/to/news_store --seal [--compress]
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+import argparse
+import gzip
+import itertools
+import os
+import re
+import shutil
+import sqlite3
+import stat
+import time
+import sqlighter3_connect
+import sqlighter3_news
+
+PERIODS = {'month': '%Y-%m', 'year': '%Y'}  # Период части -> формат ключа в имени файла
+SEAL_GRACE_DAYS = 7  # Часть закрывается не раньше, чем через столько дней после конца периода (поздние новости)
+MAX_ATTACHED = 10  # Предел ATTACH в сборках SQLite по умолчанию
+CACHE_DIR = '.cache'  # Подкаталог для распакованных сжатых частей
+NAME_RE = re.compile(r'^news_(\d{4}(?:-\d{2})?)(\.sealed)?\.db(\.gz)?$')
+
+
+@dataclass
+class Partition:
+    """ Часть хранилища: ключ периода ('2025-06' или '2025'), файл и его состояние """
+    key: str
+    path: Path
+    sealed: bool = False
+    compressed: bool = False
+
+    @property
+    def ts_min(self) -> int:
+        """ Начало периода, секунды unix (включительно) """
+        return int(period_start(self.key).timestamp())
+
+    @property
+    def ts_max(self) -> int:
+        """ Конец периода, секунды unix (не включая) """
+        return int(period_end(self.key).timestamp())
+
+    @property
+    def state(self) -> str:
+        return 'сжата' if self.compressed else 'закрыта' if self.sealed else 'открыта'
+
+
+def period_key(ts: int, period: str = 'month') -> str:
+    """ Ключ части для времени ts (UTC) """
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(PERIODS[period])
+
+
+def period_start(key: str) -> datetime:
+    return datetime.strptime(key, '%Y-%m' if '-' in key else '%Y').replace(tzinfo=timezone.utc)
+
+
+def period_end(key: str) -> datetime:
+    start = period_start(key)
+    if '-' not in key:
+        return start.replace(year=start.year + 1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+class NewsStore:
+    """
+    Хранилище новостей в каталоге directory, разбитое на части по period ('month' или 'year').
+    Период задаёт только имена новых частей: уже созданные части читаются при любом period.
+    """
+
+    def __init__(self, directory: str | Path, period: str = 'month'):
+        if period not in PERIODS:
+            raise ValueError(f"Неизвестный период {period!r}, допустимы: {', '.join(PERIODS)}")
+        self.directory = Path(directory)
+        self.period = period
+        self.skipped = 0  # Строк, отброшенных из-за записи в закрытую часть
+
+    def partitions(self) -> list[Partition]:
+        """ Части хранилища по возрастанию периода """
+        found = {}
+        for path in self.directory.glob('news_*.db*'):
+            match = NAME_RE.match(path.name)
+            if match:
+                key, sealed, compressed = match.group(1), bool(match.group(2)), bool(match.group(3))
+                current = found.get(key)
+                # Одновременно .sealed.db и .sealed.db.gz бывают при прерванном сжатии — берётся несжатый
+                if current is None or (current.compressed and not compressed):
+                    found[key] = Partition(key, path, sealed, compressed)
+        return sorted(found.values(), key=lambda partition: partition.ts_min)
+
+    def _open_path(self, key: str) -> Path:
+        return self.directory / f'news_{key}.db'
+
+    def writer(self, key: str) -> sqlite3.Connection:
+        """ Соединение на запись с открытой частью key (создаётся при первом обращении) """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        connection = sqlighter3_connect.get_connection(self._open_path(key))
+        sqlighter3_news.create_tables(connection)
+        return connection
+
+    def release(self) -> None:
+        """
+        Закрывает соединения с открытыми частями, кроме части текущего периода (её держит сборщик):
+        после смены периода прошлая часть освобождается, и её можно закрыть (seal).
+        """
+        current = period_key(int(time.time()), self.period)
+        for partition in self.partitions():
+            if not partition.sealed and partition.key != current:
+                sqlighter3_connect.close_connection(partition.path)
+
+    def add_news(self, rows: list[tuple[int, str, str]]) -> int:
+        """
+        Добавляет новости (ts, section, title), раскладывая их по частям (одна транзакция на часть).
+        Строки закрытых частей не записываются (считаются в skipped). Возвращает число новых строк.
+        """
+        sealed = {partition.key for partition in self.partitions() if partition.sealed}
+        groups: dict[str, list[tuple[int, str, str]]] = {}
+        for row in rows:
+            groups.setdefault(period_key(row[0], self.period), []).append(row)
+        added = 0
+        for key, group in sorted(groups.items()):
+            if key in sealed:
+                self.skipped += len(group)
+                continue
+            added += sqlighter3_news.add_news(self.writer(key), group)
+        self.release()
+        return added
+
+    def sync_bars(self, tradedates) -> int:
+        """ Привязка новостей к свечам (sqlighter3_news.sync_bars) в открытых частях """
+        tradedates = list(tradedates)
+        count = 0
+        for partition in self.partitions():
+            if not partition.sealed:
+                count += sqlighter3_news.sync_bars(self.writer(partition.key), tradedates)
+        self.release()
+        return count
+
+    def overlapping(self, ts_from: int | None = None, ts_to: int | None = None) -> list[Partition]:
+        """ Части, пересекающиеся с [ts_from, ts_to) """
+        return [partition for partition in self.partitions()
+                if (ts_from is None or partition.ts_max > ts_from) and (ts_to is None or partition.ts_min < ts_to)]
+
+    def readable_path(self, partition: Partition) -> Path:
+        """ Файл для чтения: сжатая часть распаковывается в .cache/ (повторно — только если архив новее) """
+        if not partition.compressed:
+            return partition.path
+        target = self.directory / CACHE_DIR / partition.path.name[:-len('.gz')]
+        if not target.exists() or target.stat().st_mtime < partition.path.stat().st_mtime:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(target.name + '.tmp')
+            with gzip.open(partition.path, 'rb') as src, open(tmp, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 2 ** 20)
+            os.replace(tmp, target)
+        return target
+
+    def _uri(self, partition: Partition) -> str:
+        # Закрытые части не меняются: immutable=1 — без блокировок и файлов -wal/-shm
+        flags = 'mode=ro&immutable=1' if partition.sealed else 'mode=ro'
+        return f"{self.readable_path(partition).resolve().as_uri()}?{flags}"
+
+    def connect_range(self, ts_from: int | None = None, ts_to: int | None = None) -> sqlite3.Connection:
+        """
+        Соединение для чтения диапазона [ts_from, ts_to): части, пересекающиеся с ним, подключаются
+        через ATTACH, временные представления news и news_unique объединяют их (UNION ALL).
+        id новостей уникальны только внутри части. Больше MAX_ATTACHED частей — ValueError
+        (для длинных диапазонов — iter_news).
+        """
+        partitions = self.overlapping(ts_from, ts_to)
+        if len(partitions) > MAX_ATTACHED:
+            raise ValueError(f"Диапазон задевает {len(partitions)} частей, ATTACH допускает {MAX_ATTACHED}: "
+                             f"сузьте диапазон или читайте через iter_news")
+        connection = sqlite3.connect(':memory:', uri=True)
+        for number, partition in enumerate(partitions):
+            connection.execute(f"ATTACH DATABASE ? AS p{number}", (self._uri(partition),))
+        if not partitions:  # Пустой диапазон: пустая временная таблица той же схемы
+            sqlighter3_news.create_news_table(connection, 'temp.news')
+            connection.execute("CREATE TEMP VIEW news_unique AS SELECT * FROM temp.news")
+            return connection
+        for view in ('news', 'news_unique'):
+            connection.execute(f"CREATE TEMP VIEW {view} AS " + " UNION ALL ".join(
+                f"SELECT * FROM p{number}.{view}" for number in range(len(partitions))))
+        return connection
+
+    def iter_news(self, ts_from: int | None = None, ts_to: int | None = None,
+                  columns: str = 'ts, title', table: str = 'news') -> Iterator[tuple]:
+        """ Строки news (или news_unique) диапазона [ts_from, ts_to) по времени, часть за частью """
+        for partition in self.overlapping(ts_from, ts_to):
+            connection = sqlite3.connect(self._uri(partition), uri=True)
+            try:
+                yield from connection.execute(
+                    f"SELECT {columns} FROM {table} WHERE ts >= ? AND ts < ? ORDER BY ts",
+                    (ts_from if ts_from is not None else partition.ts_min,
+                     ts_to if ts_to is not None else partition.ts_max))
+            finally:
+                connection.close()
+
+    def seal(self, partition: Partition) -> Partition:
+        """
+        Закрывает часть: сбрасывает WAL, переводит журнал в DELETE, выполняет VACUUM и PRAGMA optimize,
+        переименовывает в .sealed.db и снимает право записи.
+        """
+        if partition.sealed:
+            return partition
+        sqlighter3_connect.close_connection(partition.path)
+        connection = sqlite3.connect(partition.path)
+        try:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            connection.execute("PRAGMA journal_mode = DELETE")
+            connection.execute("VACUUM")
+            connection.execute("PRAGMA optimize")
+        finally:
+            connection.close()
+        target = partition.path.with_name(f'news_{partition.key}.sealed.db')
+        os.replace(partition.path, target)
+        os.chmod(target, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+        return Partition(partition.key, target, sealed=True)
+
+    def compress(self, partition: Partition) -> Partition:
+        """ Сжимает закрытую часть в .sealed.db.gz и удаляет несжатый файл """
+        if not partition.sealed:
+            raise ValueError(f"Часть {partition.key} не закрыта, сжимать можно только закрытые части")
+        if partition.compressed:
+            return partition
+        target = partition.path.with_name(partition.path.name + '.gz')
+        tmp = target.with_name(target.name + '.tmp')
+        with open(partition.path, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 2 ** 20)
+        os.replace(tmp, target)
+        os.chmod(partition.path, stat.S_IWRITE | stat.S_IREAD)  # Windows не удаляет файлы только для чтения
+        partition.path.unlink()
+        return Partition(partition.key, target, sealed=True, compressed=True)
+
+    def seal_closed(self, compress: bool = False, now: float | None = None) -> list[Partition]:
+        """
+        Закрывает (и при compress сжимает) части, период которых закончился больше SEAL_GRACE_DAYS дней назад.
+        Части, занятые другими соединениями, пропускаются. Возвращает обработанные части.
+        """
+        limit = (now if now is not None else time.time()) - SEAL_GRACE_DAYS * sqlighter3_news.SECONDS_PER_DAY
+        done = []
+        for partition in self.partitions():
+            if partition.ts_max > limit or (partition.sealed and (partition.compressed or not compress)):
+                continue
+            try:
+                partition = self.seal(partition)
+            except (sqlite3.OperationalError, OSError) as e:  # Часть открыта другим процессом
+                print(f"{partition.key}: не закрыта ({e})")
+                continue
+            if compress:
+                try:
+                    partition = self.compress(partition)
+                except OSError as e:
+                    print(f"{partition.key}: не сжата ({e})")
+            done.append(partition)
+        return done
+
+    def import_db(self, db_path: str | Path, batch_size: int = 50000) -> int:
+        """
+        Переносит новости из одной БД новостей (схема sqlighter3_news) в хранилище пакетами по времени.
+        Повторный запуск не дублирует строки (ключ дедупликации). Возвращает число новых строк.
+        """
+        source = sqlighter3_connect.get_connection(db_path, readonly=True)
+        cursor = source.execute("""
+            SELECT n.ts, s.name, n.title
+            FROM news n LEFT JOIN sections s ON s.id = n.section_id
+            ORDER BY n.ts
+        """)
+        added = 0
+        while rows := cursor.fetchmany(batch_size):
+            added += self.add_news(rows)
+            print(f"Перенесено строк: {added}, до {datetime.fromtimestamp(rows[-1][0], timezone.utc):%Y-%m-%d}")
+        return added
+
+    def export_db(self, db_path: str | Path, batch_size: int = 50000, full: bool = False) -> int:
+        """
+        Собирает хранилище в одну БД новостей (обратное import_db) для выгрузок, поиска и колоночной копии.
+        Повторный запуск читает части только с последней новости в БД минус SEAL_GRACE_DAYS дней
+        (поздние новости) и дописывает новые строки (ключ дедупликации); full — пройти всю историю.
+        Возвращает число новых строк.
+        """
+        target = sqlighter3_connect.get_connection(db_path)
+        sqlighter3_news.create_tables(target)
+        last_ts = None if full else target.execute("SELECT MAX(ts) FROM news").fetchone()[0]
+        ts_from = last_ts - SEAL_GRACE_DAYS * sqlighter3_news.SECONDS_PER_DAY if last_ts is not None else None
+        rows = self.iter_news(ts_from, columns='ts, (SELECT name FROM sections s WHERE s.id = section_id), title')
+        added = 0
+        while batch := list(itertools.islice(rows, batch_size)):
+            added += sqlighter3_news.add_news(target, batch)
+            print(f"Собрано строк: {added}, до {datetime.fromtimestamp(batch[-1][0], timezone.utc):%Y-%m-%d}")
+        return added
+
+if __name__ == '__main__':  # Перенос, закрытие и сжатие частей, сводка по хранилищу
+    parser = argparse.ArgumentParser(description="Хранилище новостей, разбитое по периодам")
+    parser.add_argument('--dir', default=r'C:\Users\Alkor\gd\data_rss_db\news_store', help="Каталог хранилища")
+    parser.add_argument('--period', choices=tuple(PERIODS), default='month', help="Период новых частей")
+    parser.add_argument('--import', dest='import_db', help="Перенести новости из одной БД новостей")
+    parser.add_argument('--export', dest='export_db',
+                        help="Собрать хранилище в одну БД новостей (для выгрузок, поиска и колоночной копии)")
+    parser.add_argument('--full', action='store_true',
+                        help="С --export: пройти всю историю, а не только последние дни")
+    parser.add_argument('--seal', action='store_true',
+                        help=f"Закрыть части, период которых кончился больше {SEAL_GRACE_DAYS} дней назад")
+    parser.add_argument('--compress', action='store_true', help="Сжать закрытые части (gzip)")
+    args = parser.parse_args()
+
+    store = NewsStore(args.dir, args.period)
+    if args.import_db:
+        if not Path(args.import_db).exists():
+            print("Ошибка: Файл базы данных новостей не найден.")
+            exit()
+        print(f"Новых строк: {store.import_db(args.import_db)}")
+    if args.export_db:
+        print(f"Новых строк в {args.export_db}: {store.export_db(args.export_db, full=args.full)}")
+    if args.seal or args.compress:
+        for partition in store.seal_closed(compress=args.compress):
+            print(f"{partition.key}: {partition.state}")
+    for partition in store.partitions():
+        print(f"{partition.key:<8} {partition.state:<8} {partition.path.stat().st_size / 2 ** 20:9.2f} МБ  {partition.path.name}")
@@ -0,0 +1,260 @@
+"""
+Выгрузка размеченного набора данных для обучения: на каждый торговый день одна запись
+(tradedate, ts_min, ts_max, next_bar, titles[]) — заголовки новостей окна между отсечками 18:45 МСК
+предыдущего и текущего дня и направление следующей свечи (те же окна и метки, что в save_md_file_news_02.py).
+
+Записи пишутся потоково в сжатые шарды ограниченного размера: JSONL (gzip) или Parquet (pyarrow).
+Новости читаются одним проходом курсора по индексу ts, в памяти — только заголовки текущего окна.
+index.csv (tradedate, shard, row, titles, bytes) даёт доступ к дню без чтения остальных шардов
+(read_day). Выгрузка инкрементальна по дате: дописываются только дни после последнего в индексе.
+
+    python save_dataset_news.py --out path/to/dataset [--format jsonl|parquet] [--shard-mb 64]
+"""
+from pathlib import Path
+import argparse
+import csv
+import gzip
+import json
+import numpy as np
+import pandas as pd
+import sqlighter3_connect
+from save_md_file_news_02 import CUTOFF, read_bars, assign_windows, last_labeled
+
+INDEX_NAME = 'index.csv'
+INDEX_COLUMNS = ['tradedate', 'shard', 'row', 'titles', 'bytes']
+FORMATS = {'jsonl': '.jsonl.gz', 'parquet': '.parquet'}
+SHARD_BYTES = 64 * 2 ** 20  # Ограничение шарда по объёму записей до сжатия
+FETCH_SIZE = 10000  # Строк новостей за одно обращение к курсору
+ROW_GROUP_SIZE = 256  # Записей в группе строк Parquet (столько держится в памяти до записи)
+
+
+def iter_records(conn, bars: pd.DataFrame, first: int, table: str = 'news'):
+    """
+    Записи окон first..последней свечи с меткой next_bar по возрастанию даты.
+    Окна без новостей пропускаются. table — 'news' или 'news_unique' (без почти-дубликатов).
+    """
+    last = last_labeled(bars)
+    if first > last:
+        return
+    cutoffs = bars['cutoff'].to_numpy(np.int64)
+    cursor = conn.execute(f"SELECT ts, title FROM {table} WHERE ts > ? AND ts < ? ORDER BY ts",
+                          (int(cutoffs[first - 1]), int(cutoffs[last])))
+    current, titles = None, []
+    while rows := cursor.fetchmany(FETCH_SIZE):
+        windows = assign_windows(np.fromiter((row[0] for row in rows), np.int64, len(rows)), cutoffs)
+        for window, (_, title) in zip(windows.tolist(), rows):
+            if window < first:
+                continue  # Ровно на отсечке
+            if window != current:
+                if titles:
+                    yield make_record(bars, current, titles)
+                current, titles = window, []
+            titles.append(title)
+    if titles:
+        yield make_record(bars, current, titles)
+
+
+def make_record(bars: pd.DataFrame, i: int, titles: list[str]) -> dict:
+    return {
+        'tradedate': bars.at[i, 'TRADEDATE'],
+        'ts_min': int(bars.at[i - 1, 'cutoff']),
+        'ts_max': int(bars.at[i, 'cutoff']),
+        'next_bar': bars.at[i, 'next_bar'],
+        'titles': titles,
+    }
+
+
+class ShardWriter:
+    """
+    Запись в шарды out_dir/shard-NNNNN<ext>: новый шард, когда объём записей текущего
+    превышает shard_bytes. Для каждой записи возвращает (имя шарда, номер строки в нём).
+    """
+
+    def __init__(self, out_dir: Path, shard_bytes: int, shard: int = 0, rows: int = 0, size: int = 0):
+        self.out_dir = out_dir
+        self.shard_bytes = shard_bytes
+        self.shard, self.rows, self.size = shard, rows, size
+        self.ext = FORMATS[self.format]
+
+    @property
+    def name(self) -> str:
+        return f"shard-{self.shard:05d}{self.ext}"
+
+    def write(self, record: dict, size: int) -> tuple[str, int]:
+        if self.rows and self.size + size > self.shard_bytes:
+            self.close()
+            self.shard, self.rows, self.size = self.shard + 1, 0, 0
+        self._write(record)
+        position = (self.name, self.rows)
+        self.rows += 1
+        self.size += size
+        return position
+
+
+class JsonlShardWriter(ShardWriter):
+    """ JSONL со сжатием gzip. Незаполненный шард прошлого запуска дописывается новым gzip-блоком """
+    format = 'jsonl'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file = None
+
+    def _write(self, record: dict) -> None:
+        if self.file is None:
+            self.file = gzip.open(self.out_dir / self.name, 'at', encoding='utf-8')
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ParquetShardWriter(ShardWriter):
+    """ Parquet (zstd) группами по ROW_GROUP_SIZE записей. Parquet не дописывается: каждый запуск — новый шард """
+    format = 'parquet'
+
+    def __init__(self, out_dir: Path, shard_bytes: int, shard: int = 0, rows: int = 0, size: int = 0):
+        if rows:  # Закрытый файл Parquet продолжить нельзя
+            shard, rows, size = shard + 1, 0, 0
+        super().__init__(out_dir, shard_bytes, shard, rows, size)
+        import pyarrow as pa
+
+        self.schema = pa.schema([
+            ('tradedate', pa.string()), ('ts_min', pa.int64()), ('ts_max', pa.int64()),
+            ('next_bar', pa.string()), ('titles', pa.list_(pa.string())),
+        ])
+        self.writer = None
+        self.buffer: list[dict] = []
+
+    def _write(self, record: dict) -> None:
+        self.buffer.append(record)
+        if len(self.buffer) >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.buffer:
+            return
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.out_dir / self.name, self.schema, compression='zstd')
+        self.writer.write_table(pa.Table.from_pylist(self.buffer, schema=self.schema))
+        self.buffer.clear()
+
+    def close(self) -> None:
+        self._flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def read_index(out_dir: Path) -> pd.DataFrame:
+    """ Индекс набора данных (пустой, если выгрузки ещё не было) """
+    path = out_dir / INDEX_NAME
+    if not path.exists():
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return pd.read_csv(path, dtype={'tradedate': str, 'shard': str})
+
+
+def read_day(out_dir: Path, tradedate: str) -> dict | None:
+    """ Запись дня по индексу: читается только нужный шард (для Parquet — одна группа строк) """
+    index = read_index(out_dir)
+    found = index[index['tradedate'] == tradedate]
+    if found.empty:
+        return None
+    shard, row = found.iloc[-1]['shard'], int(found.iloc[-1]['row'])
+    if shard.endswith(FORMATS['parquet']):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(out_dir / shard)
+        for group in range(parquet.num_row_groups):
+            rows = parquet.metadata.row_group(group).num_rows
+            if row < rows:
+                return parquet.read_row_group(group).slice(row, 1).to_pylist()[0]
+            row -= rows
+        return None
+    with gzip.open(out_dir / shard, 'rt', encoding='utf-8') as file:
+        for number, line in enumerate(file):
+            if number == row:
+                return json.loads(line)
+    return None
+
+
+def export(path_db_quote: Path, path_db_news: Path, out_dir: Path, fmt: str = 'jsonl',
+           shard_bytes: int = SHARD_BYTES, cutoff: str = CUTOFF, horizon: int = 1, flat: float = 0.0,
+           unique: bool = False) -> int:
+    """
+    Дописывает в набор данных дни после последнего в индексе. Возвращает число новых записей.
+    cutoff, horizon, flat — отсечка и параметры метки (см. save_md_file_news_02.label_bars),
+    unique — по одной новости на кластер почти-дубликатов (news_unique);
+    в одном каталоге набора данных их не следует менять между запусками.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = read_index(out_dir)
+    if not index.empty and not index['shard'].iloc[-1].endswith(FORMATS[fmt]):
+        raise ValueError(f"Набор данных в {out_dir} записан в другом формате: {index['shard'].iloc[-1]}")
+
+    bars = read_bars(path_db_quote, (cutoff,), (horizon,), flat)
+    if index.empty:
+        first, position = 1, {}
+    else:
+        first = max(1, int(np.searchsorted(bars['TRADEDATE'].to_numpy(), index['tradedate'].iloc[-1], 'right')))
+        last_shard = index[index['shard'] == index['shard'].iloc[-1]]
+        position = {'shard': int(last_shard['shard'].iloc[0][len('shard-'):][:5]),
+                    'rows': len(last_shard), 'size': int(last_shard['bytes'].sum())}
+
+    writer_class = ParquetShardWriter if fmt == 'parquet' else JsonlShardWriter
+    writer = writer_class(out_dir, shard_bytes, **position)
+    conn = sqlighter3_connect.get_connection(path_db_news, readonly=True)
+    count = 0
+    index_path = out_dir / INDEX_NAME
+    new_index = not index_path.exists()
+    with open(index_path, 'a', newline='', encoding='utf-8') as index_file:
+        index_writer = csv.writer(index_file)
+        if new_index:
+            index_writer.writerow(INDEX_COLUMNS)
+        try:
+            pending = []  # Строки индекса пишутся после закрытия шарда, чтобы не ссылаться на незаписанное
+            for record in iter_records(conn, bars, first, 'news_unique' if unique else 'news'):
+                size = sum(len(title) for title in record['titles']) + 64
+                shard_before = writer.name
+                shard, row = writer.write(record, size)
+                if shard != shard_before:
+                    index_writer.writerows(pending)
+                    pending.clear()
+                pending.append([record['tradedate'], shard, row, len(record['titles']), size])
+                count += 1
+        finally:
+            writer.close()
+            index_writer.writerows(pending)
+    print(f"Записей добавлено: {count}" + (f", последний шард: {writer.name}" if count else ""))
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Выгрузка размеченного набора данных новостей в шарды")
+    parser.add_argument('--quote-db', default=r'c:\Users\Alkor\gd\data_quote_db\RTS_day_rss_2025.db',
+                        help="БД котировок")
+    parser.add_argument('--news-db', default=r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db',
+                        help="БД новостей")
+    parser.add_argument('--out', default='c:/news_dataset', help="Каталог набора данных")
+    parser.add_argument('--format', choices=tuple(FORMATS), default='jsonl', help="Формат шардов")
+    parser.add_argument('--shard-mb', type=float, default=SHARD_BYTES / 2 ** 20,
+                        help="Объём записей в одном шарде до сжатия, МБ")
+    parser.add_argument('--cutoff', default=CUTOFF, help="Время отсечки МСК")
+    parser.add_argument('--horizon', type=int, default=1, help="Метка по направлению следующих N свечей")
+    parser.add_argument('--flat', type=float, default=0.0,
+                        help="Нейтральная зона метки: |доходность| <= flat — 'flat'")
+    parser.add_argument('--unique', action='store_true',
+                        help="По одной новости на кластер почти-дубликатов (см. near_duplicates.py)")
+    args = parser.parse_args()
+
+    for path in (Path(args.quote_db), Path(args.news_db)):
+        if not path.exists():
+            print(f"Ошибка: Файл базы данных {path} не найден.")
+            exit()
+
+    export(Path(args.quote_db), Path(args.news_db), Path(args.out), args.format, int(args.shard_mb * 2 ** 20),
+           args.cutoff, args.horizon, args.flat, args.unique)
@@ -1,139 +1,361 @@
+import hashlib
+import json
+import os
+import argparse
+import numpy as np
 import pandas as pd
 from pathlib import Path
-import sqlite3
-from datetime import datetime
-from zoneinfo import ZoneInfo
+import sqlighter3_connect
+import sqlighter3_news
 
 
-def msk_to_gmt(dt_str: str) -> str:
+def read_db_news_ts(db_path_news: Path, ts_min: int, ts_max: int | None = None, table: str = 'news',
+                    mirror: Path | None = None, store=None) -> pd.DataFrame:
     """
-    Преобразует строку даты-времени из МСК в GMT (ISO-формат).
+    Читает новости одним запросом по индексу ts: ts_min < ts (< ts_max, если задан).
+    Возвращает колонки ts (секунды unix, UTC) и title, отсортированные по ts.
+    table — 'news' или 'news_unique' (по одной новости на кластер почти-дубликатов, см. near_duplicates).
+    mirror — читать из колоночной копии (см. columnar_mirror) вместо БД.
+    store — читать из хранилища по частям (news_partitions.NewsStore) вместо БД.
     """
-    dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-    dt = dt.replace(tzinfo=ZoneInfo("Europe/Moscow"))
-    dt_gmt = dt.astimezone(ZoneInfo("Etc/GMT"))
-    return dt_gmt.strftime("%Y-%m-%d %H:%M:%S")
+    if mirror is not None:
+        import columnar_mirror
+        return columnar_mirror.read_news(mirror, ts_min, ts_max, unique=table == 'news_unique')
+    if store is not None:
+        return pd.DataFrame(list(store.iter_news(ts_min + 1, ts_max, table=table)), columns=['ts', 'title'])
+    conn = sqlighter3_connect.get_connection(db_path_news, readonly=True)
+    if ts_max is None:
+        query, params = f"SELECT ts, title FROM {table} WHERE ts > ? ORDER BY ts", (ts_min,)
+    else:
+        query, params = f"SELECT ts, title FROM {table} WHERE ts > ? AND ts < ? ORDER BY ts", (ts_min, ts_max)
+    return pd.read_sql_query(query, conn, params=params)
 
 
-def read_db_quote(db_path_quote: Path) -> pd.DataFrame:
+CUTOFF = sqlighter3_news.BAR_CUTOFF  # Время отсечки МСК, которое разделяет новости соседних торговых дней
+
+
+def msk_cutoffs_to_ts(tradedates: pd.Series, cutoff: str = CUTOFF) -> np.ndarray:
+    """
+    Векторно переводит даты торгов с временем отсечки МСК в секунды unix (UTC).
+    """
+    days = tradedates if pd.api.types.is_datetime64_any_dtype(tradedates) else pd.to_datetime(tradedates.astype(str))
+    local = (days + pd.Timedelta(cutoff)).dt.tz_localize("Europe/Moscow")
+    return ((local.dt.tz_convert("UTC") - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+
+
+def cutoff_column(cutoff: str) -> str:
+    """ Имя колонки отсечки в read_bars: '18:45:00' -> 'cutoff_1845' """
+    return 'cutoff_' + cutoff.replace(':', '')[:4]
+
+
+def label_bars(open_: np.ndarray, close: np.ndarray, horizon: int = 1, flat: float = 0.0) -> np.ndarray:
     """
-    Читает таблицу Futures из базы данных котировок и возвращает DataFrame.
+    Метка для каждой свечи t по следующим horizon свечам: доходность от открытия t+1 до закрытия t+horizon.
+    'up' — выше flat, 'down' — ниже -flat, иначе 'flat'. При flat=0 нулевая доходность — 'down'
+    (как прежнее сравнение OPEN < CLOSE). У последних horizon свечей метки нет (None).
     """
-    with sqlite3.connect(db_path_quote) as conn:
-        return pd.read_sql_query("SELECT * FROM Futures", conn)
+    n = len(close)
+    labels = np.full(n, None, dtype=object)
+    if n > horizon:
+        ret = close[horizon:] / open_[1:n - horizon + 1] - 1
+        down = ret < -flat if flat else ret <= 0
+        labels[:n - horizon] = np.where(ret > flat, 'up', np.where(down, 'down', 'flat'))
+    return labels
 
 
-def read_db_news(db_path_news: Path, date_max: str, date_min: str) -> pd.DataFrame:
+def assign_windows(ts: np.ndarray, cutoffs: np.ndarray) -> np.ndarray:
     """
-    Читает новости из базы данных за указанный период времени.
+    Номер окна для каждой новости: i, если cutoffs[i - 1] < ts < cutoffs[i] (cutoffs по возрастанию).
+    Новости вне окон и ровно на границе получают -1.
     """
-    with sqlite3.connect(db_path_news) as conn:
-        query = """
-            SELECT * FROM news
-            WHERE date > ? AND date < ?
-        """
-        return pd.read_sql_query(query, conn, params=(date_min, date_max))
+    idx = np.searchsorted(cutoffs, ts, side='left')
+    inside = (idx > 0) & (idx < len(cutoffs))
+    inside[inside] &= ts[inside] != cutoffs[idx[inside]]
+    return np.where(inside, idx, -1)
 
 
-def read_db_news_from_date(db_path_news: Path, date_min: str) -> pd.DataFrame:
+def read_bars(db_path_quote: Path, cutoffs=(CUTOFF,), horizons=(1,), flat: float = 0.0,
+              mirror: Path | None = None) -> pd.DataFrame:
     """
-    Читает новости из базы данных начиная с указанной даты без верхней границы.
+    Свечи по возрастанию даты (колонки читаются один раз, в порядке индекса TRADEDATE) с направлением bar,
+    метками next_bar_{h} для каждого горизонта h (см. label_bars) и отсечками cutoff_HHMM для каждого
+    времени отсечки в секундах unix. next_bar и cutoff — первые горизонт и отсечка.
+    mirror — читать из колоночной копии (см. columnar_mirror) вместо БД.
     """
-    with sqlite3.connect(db_path_news) as conn:
-        query = """
-            SELECT * FROM news
-            WHERE date > ?
-        """
-        return pd.read_sql_query(query, conn, params=(date_min,))
+    if mirror is not None:
+        import columnar_mirror
+        df = columnar_mirror.read_futures(mirror, ('TRADEDATE', 'OPEN', 'CLOSE'))
+    else:
+        conn = sqlighter3_connect.get_connection(db_path_quote, readonly=True)
+        df = pd.read_sql_query("SELECT TRADEDATE, OPEN, CLOSE FROM Futures ORDER BY TRADEDATE", conn)
+    days = pd.to_datetime(df['TRADEDATE'])
+    df['TRADEDATE'] = days.dt.strftime("%Y-%m-%d")
+    open_, close = df['OPEN'].to_numpy(float), df['CLOSE'].to_numpy(float)
+    df['bar'] = np.where(open_ < close, 'up', 'down')
+    for horizon in horizons:
+        df[f'next_bar_{horizon}'] = label_bars(open_, close, horizon, flat)
+    for cutoff in cutoffs:
+        df[cutoff_column(cutoff)] = msk_cutoffs_to_ts(days, cutoff)
+    df['next_bar'] = df[f'next_bar_{horizons[0]}']
+    df['cutoff'] = df[cutoff_column(cutoffs[0])]
+    return df
+
+
+def last_labeled(bars: pd.DataFrame, label: str = 'next_bar') -> int:
+    """ Индекс последней свечи с известной меткой (-1, если таких нет) """
+    labeled = np.flatnonzero(bars[label].notna().to_numpy())
+    return int(labeled[-1]) if len(labeled) else -1
+
+
+def markdown_text(df_news: pd.DataFrame, next_bar: str) -> str:
+    """ Содержимое markdown-файла: front matter с next_bar и список заголовков """
+    return f"---\nnext_bar: {next_bar}\n---\n\n" + "".join(f"- {title}\n" for title in df_news['title'])
 
 
 def save_titles_to_markdown(df_news: pd.DataFrame, file_path: Path, next_bar: str) -> None:
     """
     Сохраняет заголовки новостей в markdown-файл с метаданными о направлении следующей свечи.
     """
-    with open(file_path, 'w', encoding='utf-8') as file:
-        # Метаданные в формате markdown front matter
-        file.write(f"---\nnext_bar: {next_bar}\n---\n\n")
-        for _, row in df_news.iterrows():
-            title = row['title']
-            file.write(f"- {title}\n")  # Записываем только заголовок в файл
+    # Метаданные в формате markdown front matter, далее только заголовки
+    file_path.write_text(markdown_text(df_news, next_bar), encoding='utf-8')
+
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
 
 
-def save_latest_titles_to_markdown(db_path_news: Path, db_path_quote: Path,
-                                   md_news_dir: Path) -> None:
+def load_manifest(md_news_dir: Path) -> dict:
     """
-    Создает markdown-файл с заголовками новостей начиная с максимальной даты в базе котировок
-    с 18:45 МСК и метаданными next_bar: current.
+    Манифест выгрузки (JSON рядом с файлами): watermark — максимальный id новости на момент выгрузки,
+    news_count — число новостей, files — по имени файла границы окна (ts_min, ts_max), число строк,
+    sha1 содержимого и метка next_bar. Нет файла или другая версия — пустой манифест.
     """
-    # Получаем максимальную дату из базы котировок
-    df_quote = read_db_quote(db_path_quote)
-    df_quote['TRADEDATE'] = pd.to_datetime(df_quote['TRADEDATE'])
-    max_date = df_quote['TRADEDATE'].max()
-    max_date_str = max_date.strftime("%Y-%m-%d")
+    try:
+        manifest = json.loads((md_news_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
 
-    # Формируем начальную дату
-    date_min = f"{max_date_str} 18:45:00"
-    date_min_gmt = msk_to_gmt(date_min)
 
-    # Читаем новости начиная с date_min_gmt
-    df_news = read_db_news_from_date(db_path_news, date_min_gmt)
+def save_manifest(md_news_dir: Path, manifest: dict) -> None:
+    """ Сохраняет манифест через временный файл """
+    manifest['version'] = MANIFEST_VERSION
+    tmp = md_news_dir / (MANIFEST_NAME + '.tmp')
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding='utf-8')
+    os.replace(tmp, md_news_dir / MANIFEST_NAME)
 
-    if len(df_news) > 0:
-        # Формируем имя файла
-        file_name = f"current.md"
-        file_path = md_news_dir / file_name
 
-        # Сохраняем новости с метаданными next_bar: current
-        save_titles_to_markdown(df_news, file_path, "current")
+def count_windows(conn, cutoffs: np.ndarray, windows, table: str = 'news',
+                  mirror: Path | None = None) -> dict[int, int]:
+    """
+    Число новостей в окнах (cutoffs[i - 1], cutoffs[i]) — одно чтение колонки ts по диапазону
+    от первого до последнего окна (из БД или колоночной копии mirror) и распределение по окнам.
+    """
+    if not windows:
+        return {}
+    ts_min, ts_max = int(cutoffs[min(windows) - 1]), int(cutoffs[max(windows)])
+    if mirror is not None:
+        import columnar_mirror
+        ts = columnar_mirror.read_news(mirror, ts_min, ts_max, unique=table == 'news_unique', columns=('ts',))['ts']
+    else:
+        ts = pd.read_sql_query(f"SELECT ts FROM {table} WHERE ts > ? AND ts < ?", conn, params=(ts_min, ts_max))['ts']
+    counts = np.bincount(assign_windows(ts.to_numpy(np.int64), cutoffs) + 1, minlength=len(cutoffs) + 1)[1:]
+    return {i: int(counts[i]) for i in windows}
 
 
-def main(path_db_quote: Path, path_db_news: Path, md_news_dir: Path) -> None:
+def mapped_counts(conn, bars: pd.DataFrame, table: str = 'news') -> dict[int, int] | None:
+    """
+    Число новостей в окнах 1..len(bars)-1 по материализованной привязке news.bar — один запрос по индексу
+    вместо распределения всех ts по окнам. None, если привязки нет или её окна не совпадают
+    с окнами bars (другая отсечка, БД новостей ещё не получила последние свечи — см. sqlighter3_news.sync_bars).
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'bars'").fetchone() is None:
+        return None
+    bar_ids = [sqlighter3_news.tradedate_bar(tradedate) for tradedate in bars['TRADEDATE']]
+    cutoffs = bars['cutoff'].tolist()
+    windows = {bar: (ts_min, ts_max) for bar, ts_min, ts_max in conn.execute("SELECT bar, ts_min, ts_max FROM bars")}
+    if any(windows.get(bar_ids[i]) != (cutoffs[i - 1], cutoffs[i]) for i in range(1, len(bars))):
+        return None
+    by_bar = sqlighter3_news.bar_counts(conn, table)
+    return {i: by_bar.get(bar_ids[i], 0) for i in range(1, len(bars))}
+
+
+def main(path_db_quote: Path, path_db_news: Path, md_news_dir: Path, full: bool = False,
+         cutoff: str = CUTOFF, horizon: int = 1, flat: float = 0.0, bars: pd.DataFrame | None = None,
+         unique: bool = False, mirror: Path | None = None, store=None) -> None:
     """
     Основная функция: читает котировки и новости, формирует и сохраняет markdown-файлы с новостями и метаданными.
+    Окна между отсечками 18:45 МСК соседних торговых дней назначаются через searchsorted
+    (число новостей в окнах — по привязке news.bar, если она актуальна, см. mapped_counts).
+    Выгрузка инкрементальная: по манифесту перезаписываются только дни, в окна которых добавились
+    новости (id выше сохранённого watermark), у которых сменились границы окна или метка next_bar,
+    или файл которых отсутствует; current.md пишется всегда. full — выгрузить всё заново.
+    cutoff — время отсечки МСК, horizon и flat — горизонт и нейтральная зона метки (см. label_bars).
+    bars — заранее прочитанные read_bars свечи (с нужными отсечкой и горизонтом), чтобы не читать их
+    для каждой отсечки заново. unique — по одной новости на кластер почти-дубликатов (news_unique).
+    mirror — читать новости и котировки из колоночной копии (см. columnar_mirror) вместо БД;
+    watermark тогда — последний id в копии, число новостей в окнах считается по колонке ts.
+    store — читать новости из хранилища по частям (news_partitions.NewsStore): id в частях свои,
+    поэтому watermark не ведётся и число новостей в окнах считается по колонке ts каждый запуск.
     """
-    df = read_db_quote(path_db_quote)
-    df['TRADEDATE'] = pd.to_datetime(df['TRADEDATE'])
-    df.sort_values(by='TRADEDATE', inplace=True)
-    df['TRADEDATE'] = df['TRADEDATE'].astype(str)
-    df['bar'] = df.apply(lambda x: 'up' if (x['OPEN'] < x['CLOSE']) else 'down', axis=1)
-    df['next_bar'] = df['bar'].shift(-1)
-    df.dropna(inplace=True)
-
-    for i in range(len(df) - 1, 0, -1):
-        row1 = df.iloc[i]
-        row2 = df.iloc[i - 1]
-
-        file_name = f"{row1['TRADEDATE']}.md"
-        date_max = f"{row1['TRADEDATE']} 18:45:00"
-        date_min = f"{row2['TRADEDATE']} 18:45:00"
-        date_max_gmt = msk_to_gmt(date_max)
-        date_min_gmt = msk_to_gmt(date_min)
-
-        print(f"{file_name} Дата max: {date_max}, Дата min: {date_min}")
-        df_news = read_db_news(path_db_news, date_max_gmt, date_min_gmt)
-        # print(df_news)
-        if len(df_news) == 0:
+    if bars is None:
+        bars = read_bars(path_db_quote, (cutoff,), (horizon,), flat, mirror)
+    df = bars.assign(cutoff=bars[cutoff_column(cutoff)], next_bar=bars[f'next_bar_{horizon}'])
+    last = last_labeled(df)  # Дни с известной меткой: 1..last
+    if last < 1:
+        return
+
+    cutoffs = df['cutoff'].to_numpy()
+    file_names = (df['TRADEDATE'] + '.md').tolist()
+    table = 'news_unique' if unique else 'news'
+    manifest = {} if full else load_manifest(md_news_dir)
+    if manifest.get('unique', False) != unique or manifest.get('store', False) != (store is not None):
+        manifest = {}  # Выгрузка с другим набором новостей или из другого источника
+    files = manifest.get('files', {})
+    if mirror is not None:
+        import columnar_mirror
+        conn = None
+        watermark, news_count = columnar_mirror.news_watermark(mirror, unique)
+    elif store is not None:
+        conn = None
+        watermark, news_count = 0, 0
+    else:
+        conn = sqlighter3_connect.get_connection(path_db_news, readonly=True)
+        watermark, news_count = conn.execute(f"SELECT COALESCE(MAX(id), 0), COUNT(*) FROM {table}").fetchone()
+
+    # Окна, которые совпадают с записанными в манифесте (те же границы)
+    known = {i for i in range(1, last + 1)
+             if file_names[i] in files
+             and (files[file_names[i]]['ts_min'], files[file_names[i]]['ts_max']) == (int(cutoffs[i - 1]), int(cutoffs[i]))}
+    old_watermark = manifest.get('watermark', 0)
+    if mirror is not None:
+        new_ts = columnar_mirror.read_news(mirror, id_min=old_watermark, unique=unique, columns=('ts',))['ts']
+        mapped = None
+    elif store is not None:
+        new_ts, mapped = None, None
+    else:
+        new_ts = pd.read_sql_query(f"SELECT ts FROM {table} WHERE id > ?", conn, params=(old_watermark,))['ts']
+        mapped = mapped_counts(conn, df, table)  # Привязка news.bar, если она актуальна
+    if (store is not None or not manifest or watermark < old_watermark
+            or news_count != manifest.get('news_count', 0) + len(new_ts)):
+        # Первая выгрузка, удаления или перенумерация новостей: пересчёт по всем окнам
+        if mapped is not None:
+            counts = mapped
+        else:
+            if mirror is not None:
+                all_ts = columnar_mirror.read_news(mirror, int(cutoffs[0]), unique=unique, columns=('ts',))['ts']
+            elif store is not None:
+                all_ts = pd.Series([ts for ts, in store.iter_news(int(cutoffs[0]) + 1, columns='ts', table=table)],
+                                   dtype=np.int64)
+            else:
+                all_ts = pd.read_sql_query(f"SELECT ts FROM {table} WHERE ts > ?", conn, params=(int(cutoffs[0]),))['ts']
+            windows = assign_windows(all_ts.to_numpy(np.int64), cutoffs)
+            counts = dict(zip(*np.unique(windows[windows > 0], return_counts=True)))
+        changed = {i for i in range(1, last + 1)
+                   if i not in known or counts.get(i, 0) != files[file_names[i]]['rows']}
+    else:
+        windows = assign_windows(new_ts.to_numpy(np.int64), cutoffs)
+        gained = dict(zip(*np.unique(windows[windows > 0], return_counts=True)))
+        counts = {i: files[file_names[i]]['rows'] + gained.get(i, 0) for i in known}
+        unknown = set(range(1, last + 1)) - known
+        counts.update({i: mapped[i] for i in unknown} if mapped is not None
+                      else count_windows(conn, cutoffs, unknown, table, mirror))
+        changed = {i for i in gained if i <= last} | (set(range(1, last + 1)) - known)
+
+    # Как и прежде, выгружаются дни от новых к старым до первого дня без новостей
+    exported = []
+    for i in range(last, 0, -1):
+        if not counts.get(i):
             break
+        exported.append(i)
+    dirty = [i for i in reversed(exported)
+             if i in changed
+             or files.get(file_names[i], {}).get('next_bar') != df.at[i, 'next_bar']
+             or not (md_news_dir / file_names[i]).exists()]
 
-        save_titles_to_markdown(df_news, Path(fr'{md_news_dir}/{file_name}'), row1['next_bar'])
+    # Новости грязных окон: один запрос на каждую непрерывную серию окон
+    runs = []
+    for i in dirty:
+        if runs and runs[-1][-1] == i - 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    new_files = {name: files[name] for name in (file_names[i] for i in exported) if name in files}
+    written = 0
+    for run in runs:
+        df_news = read_db_news_ts(path_db_news, int(cutoffs[run[0] - 1]), int(cutoffs[run[-1]]), table, mirror, store)
+        groups = dict(list(df_news.groupby(assign_windows(df_news['ts'].to_numpy(np.int64), cutoffs))))
+        for i in run:
+            group = groups.get(i, df_news.iloc[:0])
+            text = markdown_text(group, df.at[i, 'next_bar'])
+            digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+            entry = files.get(file_names[i], {})
+            if entry.get('sha1') != digest or not (md_news_dir / file_names[i]).exists():
+                (md_news_dir / file_names[i]).write_text(text, encoding='utf-8')
+                written += 1
+                print(f"{file_names[i]} Дата min: {df.at[i - 1, 'TRADEDATE']} {cutoff}, новостей: {len(group)}")
+            new_files[file_names[i]] = {
+                'ts_min': int(cutoffs[i - 1]), 'ts_max': int(cutoffs[i]), 'rows': len(group),
+                'sha1': digest, 'next_bar': df.at[i, 'next_bar'],
+            }
+    print(f"Дней в выгрузке: {len(exported)}, проверено: {len(dirty)}, перезаписано: {written}")
 
-    # Вызываем функцию для создания файла с последними новостями
-    save_latest_titles_to_markdown(path_db_news, path_db_quote, md_news_dir)
+    # Новости после последней отсечки — файл current.md
+    df_current = read_db_news_ts(path_db_news, int(cutoffs[-1]), table=table, mirror=mirror, store=store)
+    if len(df_current) > 0:
+        save_titles_to_markdown(df_current, md_news_dir / "current.md", "current")
+
+    save_manifest(md_news_dir, {'watermark': watermark, 'news_count': news_count, 'unique': unique,
+                                'store': store is not None, 'files': new_files})
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Выгрузка заголовков новостей по торговым дням в markdown")
+    parser.add_argument('--full', action='store_true', help="Перезаписать все дни, игнорируя манифест")
+    parser.add_argument('--cutoff', action='append',
+                        help=f"Время отсечки МСК (по умолчанию {CUTOFF}); несколько — каждая в подкаталог HHMM")
+    parser.add_argument('--horizon', type=int, default=1, help="Метка по направлению следующих N свечей")
+    parser.add_argument('--flat', type=float, default=0.0,
+                        help="Нейтральная зона метки: |доходность| <= flat — 'flat'")
+    parser.add_argument('--unique', action='store_true',
+                        help="По одной новости на кластер почти-дубликатов (см. near_duplicates.py)")
+    parser.add_argument('--mirror', type=Path,
+                        help="Читать новости и котировки из колоночной копии (см. columnar_mirror.py)")
+    parser.add_argument('--store', type=Path,
+                        help="Читать новости из хранилища по частям (см. news_partitions.py) вместо одной БД")
+    args = parser.parse_args()
+
     path_db_quote = Path(fr'c:\Users\Alkor\gd\data_quote_db\RTS_day_rss_2025.db')
     path_db_news = Path(fr'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db')
     md_news_dir = Path('c:/news')
 
-    if not path_db_quote.exists():
+    if args.mirror is not None and not (args.mirror / 'news').exists():
+        print("Ошибка: Колоночная копия не найдена (см. columnar_mirror.py).")
+        exit()
+
+    if args.mirror is None and not path_db_quote.exists():
         print("Ошибка: Файл базы данных котировок не найден.")
         exit()
 
-    if not path_db_news.exists():
+    store = None
+    if args.store is not None:
+        import news_partitions
+        store = news_partitions.NewsStore(args.store)
+        if not store.partitions():
+            print("Ошибка: Хранилище новостей пусто или не найдено (см. news_partitions.py).")
+            exit()
+
+    if args.mirror is None and store is None and not path_db_news.exists():
         print("Ошибка: Файл базы данных новостей не найден.")
         exit()
 
     (Path(md_news_dir)).mkdir(parents=True, exist_ok=True)
 
-    main(path_db_quote, path_db_news, md_news_dir)
\ No newline at end of file
+    cutoffs = args.cutoff or [CUTOFF]
+    bars = read_bars(path_db_quote, cutoffs, (args.horizon,), args.flat, args.mirror)  # Один проход по котировкам
+    for cutoff in cutoffs:
+        out_dir = md_news_dir if len(cutoffs) == 1 else md_news_dir / cutoff.replace(':', '')[:4]
+        out_dir.mkdir(parents=True, exist_ok=True)
+        main(path_db_quote, path_db_news, out_dir, full=args.full,
+             cutoff=cutoff, horizon=args.horizon, bars=bars, unique=args.unique, mirror=args.mirror,
+             store=store)
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Поиск заголовков в БД новостей по полнотекстовому индексу FTS5 (news_fts) с ранжированием BM25,
+фильтром по датам (МСК) и фрагментами с подсветкой совпадений.
+Слова запроса ищутся по основе: 'санкции' найдёт и 'санкций', и 'санкциями'.
+
+    python search_news.py нефть --from 2025-01-01 --to 2025-03-01 --limit 20
+    python search_news.py '"ЦБ" AND (ставк* OR ключев*)' --raw
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+import argparse
+import time
+import sqlighter3_connect
+import sqlighter3_news
+
+MSK = ZoneInfo("Europe/Moscow")
+
+
+def msk_date_to_ts(date: str) -> int:
+    """ 'YYYY-MM-DD' или 'YYYY-MM-DD HH:MM' по МСК -> секунды unix """
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(date, fmt).replace(tzinfo=MSK).timestamp())
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Неверная дата: {date}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Полнотекстовый поиск по заголовкам новостей")
+    parser.add_argument('query', nargs='+', help="Слова запроса (или запрос FTS5 с --raw)")
+    parser.add_argument('--db', default=r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db',
+                        help="Путь к БД новостей")
+    parser.add_argument('--from', dest='date_from', type=msk_date_to_ts, help="С даты (МСК), включительно")
+    parser.add_argument('--to', dest='date_to', type=msk_date_to_ts, help="По дату (МСК), не включая")
+    parser.add_argument('--limit', type=int, default=20, help="Сколько результатов вывести")
+    parser.add_argument('--raw', action='store_true', help="Передать запрос в FTS5 без обработки")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print("Ошибка: Файл базы данных новостей не найден.")
+        exit()
+
+    connection = sqlighter3_connect.get_connection(args.db, readonly=True)
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'news_fts'").fetchone() is None:
+        print("Индекс news_fts не создан: выполните python sqlighter3_news.py --db ...")
+        exit()
+
+    query = ' '.join(args.query)
+    started = time.perf_counter()
+    rows = sqlighter3_news.search_news(connection, query, args.date_from, args.date_to, args.limit, args.raw)
+    elapsed = time.perf_counter() - started
+    for ts, section, title, snippet, rank in rows:
+        date = datetime.fromtimestamp(ts, timezone.utc).astimezone(MSK).strftime("%Y-%m-%d %H:%M")
+        print(f"{date}  {rank:7.2f}  [{section or '-'}] {snippet}")
+    print(f"Найдено: {len(rows)} (запрос FTS5: {query if args.raw else sqlighter3_news.fts_query(query)}), "
+          f"{elapsed * 1000:.1f} мс")
@@ -1,10 +1,13 @@
 """
 Создание БД с таблицей Futures при запуске скрипта.
 При доступе из других модулей получает доступ к БД.
+Соединения открываются через sqlighter3_connect (WAL, одно соединение на процесс).
 """
+from itertools import islice
 from pathlib import Path
 import sqlite3
 import pandas as pd
+import sqlighter3_connect
 
 
 def create_tables(connection: sqlite3.Connection) -> None:
@@ -23,6 +26,46 @@ def create_tables(connection: sqlite3.Connection) -> None:
             print('Taблица в БД создана или уже существует')
         except sqlite3.OperationalError as e:
             print(f"Ошибка при создании таблицы Futures: {e}")
+    create_securities_table(connection)
+
+
+def create_securities_table(connection: sqlite3.Connection) -> None:
+    """ Таблица-кэш описаний инструментов (SHORTNAME, LSTTRADE, LSTDELDATE) с MOEX ISS """
+    with connection:
+        connection.execute('''CREATE TABLE if not exists Securities (
+                        SECID             TEXT PRIMARY KEY NOT NULL,
+                        SHORTNAME         TEXT NOT NULL,
+                        LSTTRADE          DATE,
+                        LSTDELDATE        DATE,
+                        FETCHED           TIMESTAMP NOT NULL)'''
+                           )
+
+
+def get_securities(connection: sqlite3.Connection, secids) -> dict[str, dict]:
+    """ Описания инструментов из кэша: {SECID: {SHORTNAME, LSTTRADE, LSTDELDATE, FETCHED}} """
+    secids = list(secids)
+    result = {}
+    for i in range(0, len(secids), 500):  # Ограничение числа параметров запроса
+        chunk = secids[i:i + 500]
+        rows = connection.execute(
+            f"SELECT SECID, SHORTNAME, LSTTRADE, LSTDELDATE, FETCHED FROM Securities "
+            f"WHERE SECID IN ({','.join('?' * len(chunk))})", chunk
+        ).fetchall()
+        for secid, shortname, lsttrade, lstdeldate, fetched in rows:
+            result[secid] = {'SHORTNAME': shortname, 'LSTTRADE': lsttrade,
+                             'LSTDELDATE': lstdeldate, 'FETCHED': fetched}
+    return result
+
+
+def save_securities(connection: sqlite3.Connection, securities: dict[str, dict]) -> None:
+    """ Сохраняет (заменяет) описания инструментов в кэше одной транзакцией """
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO Securities (SECID, SHORTNAME, LSTTRADE, LSTDELDATE, FETCHED) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(secid, info['SHORTNAME'], info['LSTTRADE'], info['LSTDELDATE'], info['FETCHED'])
+             for secid, info in securities.items()]
+        )
 
 
 # def non_empty_table_futures(connection, cursor):
@@ -54,6 +97,85 @@ def add_tradedate_future(connection, cursor, tradedate, secid, open, low, high,
         print(f"Ошибка вставки данных в таблицу Futures: {e}")
 
 
+FUTURES_COLUMNS = ('TRADEDATE', 'SECID', 'OPEN', 'LOW', 'HIGH', 'CLOSE', 'LSTTRADE')
+
+
+def get_tradedates(connection: sqlite3.Connection) -> set[str]:
+    """ Все даты таблицы Futures одним запросом (для проверок без обращения к БД на каждый день) """
+    return {row[0] for row in connection.execute("SELECT TRADEDATE FROM Futures")}
+
+
+def _bar_rows(bars):
+    """ Строки для вставки из DataFrame (колонки FUTURES_COLUMNS) или итерируемого кортежей в том же порядке """
+    if isinstance(bars, pd.DataFrame):
+        bars = bars[list(FUTURES_COLUMNS)].itertuples(index=False, name=None)
+    for tradedate, secid, open, low, high, close, lsttrade in bars:
+        yield str(tradedate), secid, float(open), float(low), float(high), float(close), str(lsttrade)
+
+
+def add_futures(connection: sqlite3.Connection, bars, batch_size: int = 500) -> int:
+    """
+    Пакетная запись строк в Futures: executemany, одна транзакция на пакет из batch_size строк.
+    bars — DataFrame или итерируемое кортежей (TRADEDATE, SECID, OPEN, LOW, HIGH, CLOSE, LSTTRADE).
+    Уже существующие даты пропускаются. Возвращает число записанных строк.
+    """
+    written = 0
+    rows = _bar_rows(bars)
+    while batch := list(islice(rows, batch_size)):
+        with connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO Futures (TRADEDATE, SECID, OPEN, LOW, HIGH, CLOSE, LSTTRADE) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", batch
+            )
+            written += connection.total_changes - before
+    return written
+
+
+class FuturesWriter:
+    """
+    Буфер записи в Futures для загрузчиков: даты таблицы читаются один раз в множество,
+    новые строки накапливаются и пишутся add_futures пакетами по batch_size.
+    Использование: with FuturesWriter(connection) as writer: if day not in writer: writer.add(...)
+    """
+
+    def __init__(self, connection: sqlite3.Connection, batch_size: int = 500):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.dates = get_tradedates(connection)
+        self.buffer: list[tuple] = []
+        self.written = 0
+
+    def __contains__(self, tradedate) -> bool:
+        return str(tradedate) in self.dates
+
+    def add(self, tradedate, secid, open, low, high, close, lsttrade) -> bool:
+        """ Добавляет строку в буфер, если даты ещё нет. Возвращает True, если строка добавлена """
+        if tradedate in self:
+            return False
+        self.dates.add(str(tradedate))
+        self.buffer.append((tradedate, secid, open, low, high, close, lsttrade))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        return True
+
+    def add_many(self, bars) -> int:
+        """ Добавляет строки DataFrame или итерируемого баров, возвращает число новых """
+        return sum(self.add(*row) for row in _bar_rows(bars))
+
+    def flush(self) -> None:
+        """ Записывает буфер одной транзакцией """
+        if self.buffer:
+            self.written += add_futures(self.connection, self.buffer, self.batch_size)
+            self.buffer.clear()
+
+    def __enter__(self) -> 'FuturesWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+
 def get_max_date_futures(connection, cursor):
     """ Получение максимальной даты по фьючерсам """
     with connection:
@@ -79,5 +201,4 @@ if __name__ == '__main__':  # Создание БД, если её не суще
         except PermissionError as e:
             print(f"Недостаточно прав для создания каталога {path_bd}: {e}")
 
-    with sqlite3.connect(str(db_path), check_same_thread=True) as connection:
-        create_tables(connection)
+    create_tables(sqlighter3_connect.get_connection(db_path))
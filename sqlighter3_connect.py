@@ -0,0 +1,152 @@
+"""
+Общие соединения с SQLite базами (новости и котировки) для всех скриптов.
+Соединение на запись переводит БД в режим WAL, поэтому сборщик, экспорт и загрузчик
+котировок могут работать одновременно: читатели не блокируют писателя и наоборот.
+Читатели открывают БД по URI только на чтение. Соединение к одному файлу в одном
+режиме создаётся один раз на поток и переиспользуется.
+
+Место после удалений возвращается по частям (auto_vacuum=INCREMENTAL + incremental_vacuum),
+полный VACUUM — только по запросу или когда доля свободных страниц превышает порог:
+    python sqlighter3_connect.py path/to/db [--vacuum]
+"""
+from pathlib import Path
+import argparse
+import sqlite3
+import threading
+
+BUSY_TIMEOUT_MS = 10000  # Ожидание освобождения блокировки вместо ошибки 'database is locked'
+CACHE_SIZE_KIB = 64 * 1024  # Кэш страниц на соединение
+MMAP_SIZE = 256 * 2 ** 20  # Чтение через отображение файла в память
+INCREMENTAL_VACUUM_PAGES = 2000  # Страниц, возвращаемых за один шаг incremental_vacuum
+FULL_VACUUM_RATIO = 0.3  # Доля свободных страниц, при которой выполняется полный VACUUM
+AUTO_VACUUM_MODES = {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}
+
+_local = threading.local()
+
+
+def _configure(connection: sqlite3.Connection, readonly: bool) -> None:
+    """ Настройки соединения """
+    connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    connection.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    connection.execute("PRAGMA temp_store = MEMORY")
+    if not readonly:
+        if connection.execute("PRAGMA page_count").fetchone()[0] == 0:
+            # Новая БД: режим auto_vacuum задаётся до создания таблиц, для старых — при полном VACUUM
+            connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("PRAGMA journal_mode = WAL")  # Сохраняется в файле БД
+        connection.execute("PRAGMA synchronous = NORMAL")  # В WAL не теряет целостность, fsync реже
+
+
+def connect(db_path: str | Path, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Открывает новое настроенное соединение. readonly — только чтение через URI mode=ro.
+    """
+    if readonly:
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        connection = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    else:
+        connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+    _configure(connection, readonly)
+    return connection
+
+
+def get_connection(db_path: str | Path, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Возвращает общее для процесса (в пределах потока) соединение с БД, создавая его при первом вызове.
+    Закрывать его не нужно; транзакции — через `with connection:`.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = (str(Path(db_path).resolve()), readonly)
+    connection = connections.get(key)
+    if connection is None:
+        connection = connections[key] = connect(db_path, readonly)
+    return connection
+
+
+def close_connection(db_path: str | Path) -> None:
+    """ Закрывает соединения текущего потока с файлом db_path (перед переименованием или удалением файла) """
+    connections = getattr(_local, 'connections', {})
+    path = str(Path(db_path).resolve())
+    for key in [key for key in connections if key[0] == path]:
+        connections.pop(key).close()
+
+
+def close_all() -> None:
+    """ Закрывает соединения текущего потока """
+    for connection in getattr(_local, 'connections', {}).values():
+        connection.close()
+    _local.connections = {}
+
+
+def freelist_stats(connection: sqlite3.Connection) -> dict:
+    """
+    Статистика свободного места: размер страницы, число страниц, свободных страниц,
+    их доля и режим auto_vacuum.
+    """
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    auto_vacuum = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+    return {
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist_count,
+        'freelist_ratio': freelist_count / page_count if page_count else 0.0,
+        'auto_vacuum': AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+    }
+
+
+def reclaim_space(connection: sqlite3.Connection, max_pages: int = INCREMENTAL_VACUUM_PAGES,
+                  full_ratio: float = FULL_VACUUM_RATIO, force_full: bool = False) -> dict:
+    """
+    Возвращает место после удалений.
+    Полный VACUUM (он же переводит старую БД в auto_vacuum=INCREMENTAL) — если force_full
+    или доля свободных страниц больше full_ratio. Иначе, в режиме INCREMENTAL, освобождает
+    не более max_pages страниц. Возвращает статистику до операции (freelist_stats)
+    с ключами action ('full', 'incremental', 'none') и reason.
+    """
+    stats = freelist_stats(connection)
+    if force_full or stats['freelist_ratio'] > full_ratio:
+        stats['action'] = 'full'
+        stats['reason'] = 'по запросу' if force_full else (
+            f"доля свободных страниц {stats['freelist_ratio']:.1%} > {full_ratio:.0%}")
+        if stats['auto_vacuum'] != 'INCREMENTAL':
+            connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.commit()
+        connection.execute("VACUUM")
+    elif stats['auto_vacuum'] == 'INCREMENTAL' and stats['freelist_count']:
+        stats['action'] = 'incremental'
+        stats['reason'] = f"свободных страниц {stats['freelist_count']}, шаг до {max_pages}"
+        # execute() делает один шаг оператора (= одна страница), executescript выполняет его до конца
+        connection.executescript(f"PRAGMA incremental_vacuum({max_pages});")
+    else:
+        stats['action'] = 'none'
+        stats['reason'] = 'нечего освобождать' if not stats['freelist_count'] else (
+            f"auto_vacuum={stats['auto_vacuum']}, нужен полный VACUUM для перевода в INCREMENTAL")
+    return stats
+
+
+def format_stats(stats: dict) -> str:
+    """ Строка со статистикой свободного места для вывода в консоль """
+    text = (f"страниц {stats['page_count']} по {stats['page_size']} Б, свободных {stats['freelist_count']} "
+            f"({stats['freelist_ratio']:.1%}), auto_vacuum={stats['auto_vacuum']}")
+    if 'action' in stats:
+        text += f"; действие: {stats['action']} ({stats['reason']})"
+    return text
+
+
+if __name__ == '__main__':  # Статистика свободного места и возврат места в БД
+    parser = argparse.ArgumentParser(description="Свободное место в БД SQLite")
+    parser.add_argument('db', help="Путь к БД")
+    parser.add_argument('--vacuum', action='store_true', help="Выполнить полный VACUUM")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Вернуть место шагом incremental_vacuum (или полным VACUUM выше порога)")
+    args = parser.parse_args()
+
+    connection = get_connection(args.db)
+    if args.vacuum or args.incremental:
+        print(format_stats(reclaim_space(connection, force_full=args.vacuum)))
+    print(format_stats(freelist_stats(connection)))
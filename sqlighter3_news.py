@@ -0,0 +1,538 @@
+"""
+Создание таблиц в БД новостей и функции записи в неё.
+
+Схема (версия хранится в PRAGMA user_version):
+    news     — id, ts (UTC, секунды unix), day (ts // 86400), title_hash (64-битный хэш заголовка),
+               section_id, title, bar. Дубликаты (день + заголовок) отсекаются узким уникальным
+               индексом (day, title_hash) при вставке. bar — свеча, к окну которой относится новость
+               (день TRADEDATE, как day; NULL — свечи ещё нет), индекс idx_news_bar.
+    bars     — окна свечей: bar, ts_min, ts_max — отсечки BAR_CUTOFF МСК предыдущего и этого
+               торгового дня (новость в окне, если ts_min < ts < ts_max). Заполняется sync_bars
+               по датам таблицы Futures БД котировок:
+                   python sqlighter3_news.py --quote-db path/to/RTS_day_rss_2025.db
+    sections — справочник разделов (название канала rss ленты).
+    news_fts — полнотекстовый индекс FTS5 по news.title (внешнее содержимое), поддерживается триггерами.
+    news_lsh, news_dups, news_unique — почти-дубликаты заголовков (см. near_duplicates).
+Старые БД (date TEXT, title TEXT) переводятся на новую схему пакетами:
+    python migrate_news_db.py
+Полное удаление дубликатов по всей таблице оставлено как разовая операция обслуживания:
+    python sqlighter3_news.py --dedup [--vacuum]
+"""
+from datetime import date, datetime
+from pathlib import Path
+from hashlib import blake2b
+from typing import Callable, Iterable
+from zoneinfo import ZoneInfo
+import argparse
+import re
+import sqlite3
+import near_duplicates
+import sqlighter3_connect
+
+SCHEMA_VERSION = 5  # 3 — полнотекстовый индекс news_fts, 4 — почти-дубликаты, 5 — привязка к свечам
+SECONDS_PER_DAY = 86400
+BAR_CUTOFF = "18:45:00"  # Время отсечки МСК, которое разделяет новости соседних торговых дней
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+MSK = ZoneInfo("Europe/Moscow")
+
+# Колонки состояния rss ленты в таблице feeds
+FEED_STATE_COLUMNS = {
+    'etag': 'TEXT',  # ETag последнего ответа
+    'last_modified': 'TEXT',  # Last-Modified последнего ответа
+    'content_hash': 'TEXT',  # Хэш тела последнего ответа
+    'last_pub': 'INTEGER',  # Время самой свежей новости ленты, секунды unix
+    'ttl': 'INTEGER',  # Подсказка канала <ttl>, минуты
+    'skip_hours': 'TEXT',  # Подсказка канала <skipHours>, часы GMT через запятую
+    'poll_interval': 'REAL',  # Текущий интервал опроса, сек
+    'next_due': 'REAL',  # Время следующего опроса, unix time
+}
+
+
+def title_hash(title: str) -> int:
+    """
+    64-битный хэш заголовка (знаковый, чтобы помещаться в INTEGER SQLite).
+    """
+    return int.from_bytes(blake2b(title.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    """ Версия схемы БД новостей """
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def table_columns(connection: sqlite3.Connection, table: str) -> list[str]:
+    """ Список колонок таблицы (пустой, если таблицы нет) """
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+
+
+def create_news_table(connection: sqlite3.Connection, table: str = 'news') -> None:
+    """ Создаёт таблицу новостей текущей схемы (без индексов) """
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            ts INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            title_hash INTEGER NOT NULL,
+            section_id INTEGER REFERENCES sections(id),
+            title TEXT NOT NULL,
+            bar INTEGER
+        )
+    """)
+
+
+def create_news_indexes(connection: sqlite3.Connection) -> None:
+    """ Создаёт индексы таблицы news: уникальный ключ дедупликации, индексы по времени и по свече """
+    connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_news_day_hash ON news(day, title_hash)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_news_ts ON news(ts)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_news_bar ON news(bar)")
+
+
+# Свеча окна, в которое попадает news.ts: первое окно с ts_max > ts, если ts_min < ts (ровно на отсечке — NULL)
+BAR_LOOKUP = """(
+    SELECT CASE WHEN b.ts_min < news.ts THEN b.bar END
+    FROM bars b WHERE b.ts_max > news.ts ORDER BY b.ts_max LIMIT 1
+)"""
+
+
+def tradedate_bar(tradedate: str) -> int:
+    """ Номер свечи по дате торгов 'YYYY-MM-DD': дни от 1970-01-01 (как колонка day) """
+    return date.fromisoformat(tradedate).toordinal() - EPOCH_ORDINAL
+
+
+def bar_tradedate(bar: int) -> str:
+    """ Дата торгов 'YYYY-MM-DD' по номеру свечи (обратное tradedate_bar) """
+    return date.fromordinal(bar + EPOCH_ORDINAL).isoformat()
+
+
+def cutoff_ts(tradedate: str, cutoff: str = BAR_CUTOFF) -> int:
+    """ Отсечка cutoff МСК дня tradedate в секундах unix """
+    return int(datetime.fromisoformat(f"{tradedate} {cutoff}").replace(tzinfo=MSK).timestamp())
+
+
+def bar_windows(tradedates: Iterable[str], cutoff: str = BAR_CUTOFF) -> dict[int, tuple[int, int]]:
+    """ Окна свечей {bar: (ts_min, ts_max)} между отсечками соседних дат (у первой даты окна нет) """
+    dates = sorted(set(tradedates))
+    cutoffs = [cutoff_ts(tradedate, cutoff) for tradedate in dates]
+    return {tradedate_bar(dates[i]): (cutoffs[i - 1], cutoffs[i]) for i in range(1, len(dates))}
+
+
+def create_bars_table(connection: sqlite3.Connection) -> None:
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS bars (
+            bar INTEGER PRIMARY KEY,
+            ts_min INTEGER NOT NULL,
+            ts_max INTEGER NOT NULL
+        )
+    """)
+    connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_bars_ts_max ON bars(ts_max)")
+
+
+def sync_bars(connection: sqlite3.Connection, tradedates: Iterable[str], cutoff: str = BAR_CUTOFF) -> int:
+    """
+    Приводит таблицу bars к окнам по датам торгов tradedates (все даты таблицы Futures) и
+    перепривязывает новости только изменившихся окон: обычно это одно новое окно последнего дня,
+    новости которого до сих пор были без свечи. Возвращает число новостей в перепривязанном диапазоне.
+    """
+    windows = bar_windows(tradedates, cutoff)
+    existing = {bar: (ts_min, ts_max) for bar, ts_min, ts_max in connection.execute(
+        "SELECT bar, ts_min, ts_max FROM bars")}
+    stale = {bar for bar, window in existing.items() if windows.get(bar) != window}
+    added = [bar for bar, window in windows.items() if existing.get(bar) != window]
+    if not stale and not added:
+        return 0
+    with connection:
+        connection.executemany("DELETE FROM bars WHERE bar = ?", ((bar,) for bar in stale))
+        connection.executemany("INSERT INTO bars (bar, ts_min, ts_max) VALUES (?, ?, ?)",
+                               ((bar, *windows[bar]) for bar in added))
+        connection.executemany("UPDATE news SET bar = NULL WHERE bar = ?", ((bar,) for bar in stale))
+        if not added:
+            return 0
+        cursor = connection.execute(f"UPDATE news SET bar = {BAR_LOOKUP} WHERE ts > ? AND ts < ?",
+                                    (min(windows[bar][0] for bar in added), max(windows[bar][1] for bar in added)))
+        return cursor.rowcount
+
+
+def bar_counts(connection: sqlite3.Connection, table: str = 'news') -> dict[int, int]:
+    """ Число новостей по свечам {bar: count} — один проход по индексу idx_news_bar """
+    return dict(connection.execute(f"SELECT bar, COUNT(*) FROM {table} WHERE bar IS NOT NULL GROUP BY bar"))
+
+
+def bar_news(connection: sqlite3.Connection, tradedate: str, table: str = 'news') -> list[tuple[int, str]]:
+    """ Новости окна свечи tradedate: (ts, title) по времени """
+    return connection.execute(f"SELECT ts, title FROM {table} WHERE bar = ? ORDER BY ts",
+                              (tradedate_bar(tradedate),)).fetchall()
+
+
+# Полнотекстовый индекс заголовков (FTS5, внешнее содержимое — таблица news).
+# unicode61 приводит кириллицу к нижнему регистру, remove_diacritics 2 снимает диакритику с латиницы;
+# ё/е и й/и он не склеивает (это отдельные буквы, а не диакритика), поэтому в индекс пишется
+# заголовок с заменой ё на е (fts_title), а fts_query делает ту же замену в запросе.
+# Длина слов не меняется, так что snippet по исходному заголовку подсвечивает те же слова.
+# prefix — индексы префиксов для быстрых запросов вида "санкц*".
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+FTS_PREFIX = "3 4 5"
+
+
+def fts_title(column: str) -> str:
+    """ SQL-выражение заголовка для индекса: ё и Ё заменены на е и Е """
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+FTS_TRIGGERS = {
+    'news_fts_ai': "AFTER INSERT ON news BEGIN "
+                   f"INSERT INTO news_fts(rowid, title) VALUES (new.id, {fts_title('new.title')}); END",
+    'news_fts_ad': "AFTER DELETE ON news BEGIN "
+                   "INSERT INTO news_fts(news_fts, rowid, title) "
+                   f"VALUES ('delete', old.id, {fts_title('old.title')}); END",
+    'news_fts_au': "AFTER UPDATE OF title ON news BEGIN "
+                   "INSERT INTO news_fts(news_fts, rowid, title) "
+                   f"VALUES ('delete', old.id, {fts_title('old.title')}); "
+                   f"INSERT INTO news_fts(rowid, title) VALUES (new.id, {fts_title('new.title')}); END",
+}
+# Окончания, которые отбрасываются у слов запроса (лёгкий стемминг для русского: ищется префикс основы)
+RU_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'ием', 'иях', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ская', 'ский',
+    'ское', 'ские', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ов', 'ев',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ия', 'ии', 'ию', 'ть', 'ет', 'ит', 'ут', 'ют', 'ат', 'ят',
+    'ла', 'ло', 'ли', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM = 4  # Основа не короче, чтобы префикс не стал слишком общим
+
+
+def fts_available(connection: sqlite3.Connection) -> bool:
+    """ Собран ли SQLite с FTS5 """
+    return connection.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'").fetchone() is not None
+
+
+def create_fts(connection: sqlite3.Connection) -> None:
+    """
+    Создаёт индекс news_fts и триггеры, которые поддерживают его при вставке, удалении
+    и изменении заголовков в news. Если триггеров не было или они устарели (новый индекс,
+    БД после миграции, индекс без замены ё), индекс перестраивается по текущему содержимому news.
+    """
+    connection.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+            title, content='news', content_rowid='id',
+            tokenize='{FTS_TOKENIZE}', prefix='{FTS_PREFIX}'
+        )
+    """)
+    existing = dict(connection.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'news'"))
+    stale = [name for name, body in FTS_TRIGGERS.items() if existing.get(name) != f"CREATE TRIGGER {name} {body}"]
+    for name in stale:
+        connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+        connection.execute(f"CREATE TRIGGER {name} {FTS_TRIGGERS[name]}")
+    if stale:
+        # 'rebuild' индексировал бы news.title как есть, поэтому индекс заполняется заново вручную
+        connection.execute("INSERT INTO news_fts(news_fts) VALUES ('delete-all')")
+        connection.execute(f"INSERT INTO news_fts(rowid, title) SELECT id, {fts_title('title')} FROM news")
+
+
+def fts_query(text: str) -> str:
+    """
+    Запрос FTS5 из обычного текста: каждое слово — префикс его основы (окончание отброшено),
+    слова объединяются через AND. 'санкции ЦБ' -> '"санкц"* AND "цб"'.
+    """
+    terms = []
+    for word in re.findall(r'\w+', text.lower().replace('ё', 'е')):
+        for ending in RU_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+                stem = word[:-len(ending)]
+                if stem.endswith('ь') and len(stem) > MIN_STEM:  # 'нефтью' -> 'нефт'
+                    stem = stem[:-1]
+                terms.append(f'"{stem}"*')
+                break
+        else:
+            terms.append(f'"{word}"*' if len(word) >= MIN_STEM else f'"{word}"')
+    return ' AND '.join(terms)
+
+
+def search_news(connection: sqlite3.Connection, query: str, ts_from: int | None = None,
+                ts_to: int | None = None, limit: int = 20, raw: bool = False) -> list[tuple]:
+    """
+    Поиск по заголовкам: (ts, раздел, заголовок, фрагмент с подсветкой [..], bm25) по релевантности.
+    ts_from/ts_to — границы времени (секунды unix, ts_from <= ts < ts_to).
+    raw — query передаётся в MATCH как есть (синтаксис FTS5), иначе строится fts_query.
+    """
+    sql = """
+        SELECT n.ts, s.name, n.title,
+               snippet(news_fts, 0, '[', ']', '…', 16), bm25(news_fts) AS rank
+        FROM news_fts
+        JOIN news n ON n.id = news_fts.rowid
+        LEFT JOIN sections s ON s.id = n.section_id
+        WHERE news_fts MATCH ?
+    """
+    params = [query if raw else fts_query(query)]
+    if ts_from is not None:
+        sql += " AND n.ts >= ?"
+        params.append(ts_from)
+    if ts_to is not None:
+        sql += " AND n.ts < ?"
+        params.append(ts_to)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    return connection.execute(sql, params).fetchall()
+
+
+def create_tables(connection: sqlite3.Connection) -> None:
+    """
+    Создаёт таблицы БД новостей, если их нет. Таблицу news старой схемы
+    (date TEXT, title TEXT) переводит на текущую схему (см. migrate_news).
+    """
+    if get_schema_version(connection) >= SCHEMA_VERSION:
+        return
+    with connection:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS sections (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+        # Состояние rss лент между запусками: заголовки для условного GET, хэш содержимого,
+        # время самой свежей новости и расписание опроса
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS feeds (
+                link TEXT PRIMARY KEY,
+                checked_at TEXT
+            )
+        """)
+        feed_columns = table_columns(connection, 'feeds')
+        last_pub_type = next((row[2] for row in connection.execute("PRAGMA table_info(feeds)")
+                              if row[1] == 'last_pub'), None)
+        if last_pub_type is not None and last_pub_type.upper() != FEED_STATE_COLUMNS['last_pub']:
+            # До версии 2 last_pub хранился строкой 'YYYY-MM-DD HH:MM:SS'
+            connection.execute("ALTER TABLE feeds DROP COLUMN last_pub")
+            feed_columns.remove('last_pub')
+        for column, column_type in FEED_STATE_COLUMNS.items():
+            if column not in feed_columns:
+                connection.execute(f"ALTER TABLE feeds ADD COLUMN {column} {column_type}")
+        # Кэш списка rss лент со страницы webmaster-tools
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS feed_directory (
+                position INTEGER PRIMARY KEY,
+                link TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+    news_columns = table_columns(connection, 'news')
+    if news_columns and 'ts' not in news_columns:
+        stats = migrate_news(connection)
+        if stats['invalid']:
+            print(f"Миграция news: пропущено строк без даты или заголовка: {stats['invalid']}")
+    with connection:
+        create_news_table(connection)
+        if 'bar' not in table_columns(connection, 'news'):
+            connection.execute("ALTER TABLE news ADD COLUMN bar INTEGER")
+        create_bars_table(connection)
+        create_news_indexes(connection)
+        if fts_available(connection):
+            create_fts(connection)
+        near_duplicates.create_tables(connection)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def migrate_news(connection: sqlite3.Connection, batch_size: int = 50000,
+                 progress: Callable[[int, int], None] | None = None) -> dict[str, int]:
+    """
+    Переводит таблицу news старой схемы (date TEXT, title TEXT[, day TEXT]) на текущую.
+    Строки копируются пакетами по rowid (каждый пакет — своя транзакция) в news_v2,
+    id новой строки равен rowid старой, поэтому прерванная миграция продолжается
+    с места остановки. Дубликаты (день + заголовок) при копировании отбрасываются,
+    строки с пустой или нераспознанной датой или пустым заголовком не переносятся.
+    progress(скопировано_до_rowid, max_rowid) вызывается после каждого пакета.
+    Возвращает число строк старой таблицы (rows), перенесённых (copied), пропущенных
+    без даты или заголовка (invalid) и дубликатов (duplicates).
+    """
+    connection.create_function('title_hash', 1, title_hash, deterministic=True)
+    with connection:
+        create_news_table(connection, 'news_v2')
+        connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_news_v2_day_hash ON news_v2(day, title_hash)")
+    max_rowid = connection.execute("SELECT MAX(rowid) FROM news").fetchone()[0] or 0
+    start = connection.execute("SELECT MAX(id) FROM news_v2").fetchone()[0] or 0
+    while start < max_rowid:
+        end = start + batch_size
+        with connection:
+            connection.execute(f"""
+                INSERT OR IGNORE INTO news_v2 (id, ts, day, title_hash, title)
+                SELECT rowid, ts, ts / {SECONDS_PER_DAY}, title_hash(title), title
+                FROM (
+                    SELECT rowid, CAST(strftime('%s', date) AS INTEGER) AS ts, title
+                    FROM news
+                    WHERE rowid > ? AND rowid <= ?
+                )
+                WHERE ts IS NOT NULL AND title IS NOT NULL
+                ORDER BY rowid
+            """, (start, end))
+        start = end
+        if progress:
+            progress(min(start, max_rowid), max_rowid)
+    rows, invalid = connection.execute("""
+        SELECT COUNT(*), COALESCE(SUM(title IS NULL OR strftime('%s', date) IS NULL), 0) FROM news
+    """).fetchone()
+    copied = connection.execute("SELECT COUNT(*) FROM news_v2").fetchone()[0]
+    with connection:
+        connection.execute("DROP TABLE news")
+        connection.execute("DROP INDEX idx_news_v2_day_hash")
+        connection.execute("ALTER TABLE news_v2 RENAME TO news")
+        create_news_indexes(connection)
+    return {'rows': rows, 'copied': copied, 'invalid': invalid, 'duplicates': rows - copied - invalid}
+
+
+def get_section_ids(connection: sqlite3.Connection, names: set[str]) -> dict[str, int]:
+    """
+    Возвращает id разделов по названиям, добавляя отсутствующие в справочник.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    connection.executemany("INSERT OR IGNORE INTO sections (name) VALUES (?)", ((name,) for name in names))
+    placeholders = ', '.join('?' * len(names))
+    rows = connection.execute(f"SELECT name, id FROM sections WHERE name IN ({placeholders})", tuple(names))
+    return dict(rows.fetchall())
+
+
+def add_news(connection: sqlite3.Connection, rows: list[tuple[int, str, str]], cluster: bool = True) -> int:
+    """
+    Пакетно добавляет новости (ts, section, title) одной транзакцией.
+    Новости, уже сохранённые за этот день с тем же заголовком, пропускаются, добавленные
+    в той же транзакции привязываются к свече (если её окно уже есть в bars) и разбираются
+    на почти-дубликаты (near_duplicates.cluster_new_news).
+    cluster=False — разбор откладывается до следующего вызова с cluster=True (массовая загрузка).
+    Возвращает количество реально добавленных строк.
+    """
+    with connection:
+        section_ids = get_section_ids(connection, {section for _, section, _ in rows})
+        last_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+        cursor = connection.executemany(
+            "INSERT OR IGNORE INTO news (ts, day, title_hash, section_id, title) VALUES (?, ?, ?, ?, ?)",
+            (
+                (ts, ts // SECONDS_PER_DAY, title_hash(title), section_ids.get(section), title)
+                for ts, section, title in rows
+            )
+        )
+        added = cursor.rowcount  # Без строк, изменённых триггерами (индекс news_fts)
+        connection.execute(f"UPDATE news SET bar = {BAR_LOOKUP} "
+                           "WHERE id > ? AND ts < (SELECT MAX(ts_max) FROM bars)", (last_id,))
+        if cluster:
+            near_duplicates.cluster_new_news(connection)
+        return added
+
+
+def get_feed_states(connection: sqlite3.Connection) -> dict[str, dict]:
+    """
+    Возвращает сохранённое состояние rss лент: {link: {колонка из FEED_STATE_COLUMNS: значение}}.
+    """
+    columns = list(FEED_STATE_COLUMNS)
+    rows = connection.execute(f"SELECT link, {', '.join(columns)} FROM feeds")
+    return {row[0]: dict(zip(columns, row[1:])) for row in rows}
+
+
+def save_feed_states(connection: sqlite3.Connection, states: dict[str, dict]) -> None:
+    """
+    Сохраняет состояние rss лент одной транзакцией.
+    """
+    columns = list(FEED_STATE_COLUMNS)
+    with connection:
+        connection.executemany(
+            f"INSERT OR REPLACE INTO feeds (link, {', '.join(columns)}, checked_at) "
+            f"VALUES (?, {', '.join('?' * len(columns))}, datetime('now'))",
+            ((link, *(state.get(column) for column in columns)) for link, state in states.items())
+        )
+
+
+def get_feed_directory(connection: sqlite3.Connection) -> tuple[list[str], float]:
+    """
+    Возвращает закэшированный список rss лент и время его обновления (unix time, 0 если кэша нет).
+    """
+    rows = connection.execute("SELECT link, updated_at FROM feed_directory ORDER BY position").fetchall()
+    if not rows:
+        return [], 0.0
+    return [link for link, _ in rows], rows[0][1]
+
+
+def save_feed_directory(connection: sqlite3.Connection, links: list[str], updated_at: float) -> None:
+    """
+    Заменяет закэшированный список rss лент одной транзакцией.
+    """
+    with connection:
+        connection.execute("DELETE FROM feed_directory")
+        connection.executemany(
+            "INSERT INTO feed_directory (position, link, updated_at) VALUES (?, ?, ?)",
+            ((position, link, updated_at) for position, link in enumerate(links))
+        )
+
+
+def delete_duplicates(connection: sqlite3.Connection) -> int:
+    """
+    Удаляет дубликаты по дню и title по всей таблице, оставляя самую раннюю запись.
+    Возвращает количество удалённых строк.
+    """
+    cursor = connection.execute("""
+        DELETE FROM news
+        WHERE id NOT IN (
+            SELECT id
+            FROM (
+                SELECT
+                    id,
+                    ROW_NUMBER() OVER (PARTITION BY day, title ORDER BY ts ASC) AS rn
+                FROM news
+            ) AS subquery
+            WHERE rn = 1
+        );
+    """)
+    return cursor.rowcount
+
+
+def remove_duplicates_from_db(db_path: str, full_vacuum: bool = False) -> None:
+    """
+    Разовая очистка: удаляет дубликаты по всей таблице news и возвращает место
+    (шаг incremental_vacuum или полный VACUUM, если full_vacuum либо свободных страниц больше порога).
+    """
+    conn = sqlighter3_connect.get_connection(db_path)
+    try:
+        create_tables(conn)
+        with conn:
+            deleted_count = delete_duplicates(conn)
+        print(f"Дубликаты в базе данных удалены. Удалено строк: {deleted_count}")
+    except Exception as e:
+        print(f"Ошибка при удалении дубликатов из БД: {e}")
+
+    try:
+        stats = sqlighter3_connect.reclaim_space(conn, force_full=full_vacuum)
+        print(f"Освобождение места: {sqlighter3_connect.format_stats(stats)}")
+    except Exception as e:
+        print(f"Ошибка при освобождении места в БД: {e}")
+
+
+if __name__ == '__main__':  # Создание/обновление БД новостей, разовое удаление дубликатов
+    parser = argparse.ArgumentParser(description="Обслуживание БД новостей")
+    parser.add_argument('--db', default=r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db',
+                        help="Путь к БД новостей")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Удалить дубликаты по всей таблице и вернуть освободившееся место")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="Выполнить полный VACUUM (переводит старую БД в auto_vacuum=INCREMENTAL)")
+    parser.add_argument('--quote-db', help="БД котировок: привязать новости к свечам по датам таблицы Futures")
+    args = parser.parse_args()
+
+    Path(args.db).parent.mkdir(parents=True, exist_ok=True)
+    create_tables(sqlighter3_connect.get_connection(args.db))
+    print('Taблица news в БД создана или уже существует')
+    if args.quote_db:
+        import sqlighter3_RTS_day
+
+        quote_connection = sqlighter3_connect.get_connection(args.quote_db, readonly=True)
+        connection = sqlighter3_connect.get_connection(args.db)
+        count = sync_bars(connection, sqlighter3_RTS_day.get_tradedates(quote_connection))
+        print(f"Привязка к свечам: перепривязано новостей {count}")
+        by_bar = bar_counts(connection)
+        if by_bar:
+            last_bar = max(by_bar)
+            print(f"Свечей с новостями: {len(by_bar)}, последняя: {bar_tradedate(last_bar)} "
+                  f"(новостей {by_bar[last_bar]})")
+    if args.dedup:
+        remove_duplicates_from_db(args.db, full_vacuum=args.vacuum)
+    elif args.vacuum:
+        stats = sqlighter3_connect.reclaim_space(sqlighter3_connect.get_connection(args.db), force_full=True)
+        print(f"Освобождение места: {sqlighter3_connect.format_stats(stats)}")
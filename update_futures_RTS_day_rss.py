@@ -1,21 +1,50 @@
 """
-Получение исторических данных по фьючерсам RTS с MOEX ISS API и занесение записей в БД.
+Получение исторических данных по фьючерсам (по умолчанию RTS, --tickers — несколько базовых активов,
+у каждого своя БД) с MOEX ISS API и занесение записей в БД.
 Загружать от 2014-01-01
+
+Режимы загрузки:
+    range — (по умолчанию) вся дневная история каждого контракта за период запросами from/till
+            с постраничной выборкой start (контракты и тикеры — параллельно через aiohttp),
+            непрерывный ряд ближайшего контракта строится локально;
+    daily — прежний режим: один запрос истории на каждый календарный день, тикеры по очереди;
+    async — те же запросы по дням, но параллельно (aiohttp, ограничение числа и частоты запросов),
+            строки записываются по возрастанию даты.
+После загрузки окна свечей первого тикера передаются в БД новостей (--news-db, если она есть):
+новости новых дней привязываются к свечам (sqlighter3_news.sync_bars); с --news-store — в открытых
+частях хранилища новостей по периодам (news_partitions).
 """
 from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass
+import argparse
+import asyncio
+import json
+import random
+import time
 import requests
 from datetime import datetime, timedelta
 import pandas as pd
 import sqlite3
+import http_cache
+import news_partitions
+import sqlighter3_connect
+import sqlighter3_news
 import sqlighter3_RTS_day
 
 
 def request_moex(session, url, retries=3, timeout=5):
-    """Функция запроса данных с повторными попытками"""
+    """Функция запроса данных с повторными попытками (через кэш http_cache в режимах record/replay)"""
+    cache = http_cache.get_cache()
+    if cache.replay:
+        cached = cache.load(url)
+        return cached.json() if cached else None
     for attempt in range(retries):
         try:
             response = session.get(url, timeout=timeout)
             response.raise_for_status()
+            if cache.record:
+                cache.save(url, response.status_code, response.headers, response.content)
             return response.json()
         except requests.RequestException as e:
             print(f"Ошибка запроса {url} (попытка {attempt + 1}): {e}")
@@ -23,27 +52,152 @@ def request_moex(session, url, retries=3, timeout=5):
                 return None
 
 
-def get_info_future(session, security):
-    """Запрашивает у MOEX информацию по инструменту"""
-    # print(security)
-    url = f'https://iss.moex.com/iss/securities/{security}.json'
-    j = request_moex(session, url)
+def iss_rows(j: dict, block: str) -> list[dict]:
+    """Строки блока ответа ISS в виде списка словарей"""
+    return [{k: r[i] for i, k in enumerate(j[block]['columns'])} for r in j[block]['data']]
+
+
+def parse_security_info(j: dict | None) -> dict | None:
+    """Описание инструмента из ответа securities/{SECID}.json: SHORTNAME, LSTTRADE, LSTDELDATE"""
+    if not j or 'description' not in j:
+        return None
+    values = {row['name']: row['value'] for row in iss_rows(j, 'description')}
+    return {
+        'SHORTNAME': values.get('SHORTNAME') or "",
+        'LSTTRADE': values.get('LSTTRADE'),
+        'LSTDELDATE': values.get('LSTDELDATE'),
+        'FETCHED': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def fetch_security_info(session, security) -> dict | None:
+    """Запрашивает у MOEX описание инструмента: SHORTNAME, LSTTRADE, LSTDELDATE (None при ошибке)"""
+    return parse_security_info(request_moex(session, f'https://iss.moex.com/iss/securities/{security}.json'))
+
+
+class SecurityCache:
+    """
+    Кэш описаний инструментов: LRU в памяти процесса поверх таблицы Securities в БД котировок.
+    Описание истёкшего контракта (LSTTRADE в прошлом) не меняется и не перезапрашивается,
+    у действующего — перезапрашивается через ttl. Если дата торгов больше закэшированного
+    LSTTRADE, код SECID переиспользован новым контрактом (RIH5 2015 и 2025) — описание запрашивается заново.
+    """
+
+    def __init__(self, session, connection: sqlite3.Connection,
+                 maxsize: int = 256, ttl: timedelta = timedelta(days=1)):
+        self.session = session
+        self.connection = connection
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.memory: OrderedDict[str, dict] = OrderedDict()
+        self.requests = 0  # Запросов описаний к MOEX
+        self.hits = 0  # Описаний, взятых из кэша
+        self.inflight: dict[str, asyncio.Future] = {}  # Выполняющиеся асинхронные запросы описаний
+        sqlighter3_RTS_day.create_securities_table(connection)
+
+    def _remember(self, secid: str, info: dict) -> None:
+        self.memory[secid] = info
+        self.memory.move_to_end(secid)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def _is_fresh(self, info: dict, tradedate=None) -> bool:
+        """Можно ли использовать запись кэша для строки истории с датой tradedate"""
+        lsttrade = info['LSTTRADE'] or info['LSTDELDATE']
+        if lsttrade and tradedate is not None and str(lsttrade) < str(tradedate) <= info['FETCHED']:
+            pass  # Описание получено уже после этой даты: повторный запрос ничего не изменит
+        elif lsttrade and tradedate is not None and str(lsttrade) < str(tradedate):
+            return False  # SECID переиспользован
+        today = datetime.now().date().isoformat()
+        if lsttrade and str(lsttrade) < today:
+            return True  # Контракт истёк, описание неизменно
+        return datetime.fromisoformat(info['FETCHED']) + self.ttl > datetime.now()
+
+    def _stale(self, secids, tradedate=None) -> list[str]:
+        """SECID, которых нет в памяти и в БД или записи которых устарели"""
+        missing = []
+        for secid in dict.fromkeys(secids):
+            info = self.memory.get(secid)
+            if info is not None and self._is_fresh(info, tradedate):
+                self.memory.move_to_end(secid)
+                self.hits += 1
+            else:
+                missing.append(secid)
+        if not missing:
+            return []
+        stored = sqlighter3_RTS_day.get_securities(self.connection, missing)
+        stale = []
+        for secid in missing:
+            info = stored.get(secid)
+            if info is not None and self._is_fresh(info, tradedate):
+                self.hits += 1
+                self._remember(secid, info)
+            else:
+                stale.append(secid)
+        return stale
 
-    if not j:
-        return pd.Series(["", "2130-01-01"])  # Гарантируем, что всегда 2 значения
+    def _store(self, fetched: dict[str, dict | None]) -> None:
+        """Запоминает полученные описания, ошибки запроса (None) не кэшируются"""
+        fetched = {secid: info for secid, info in fetched.items() if info is not None}
+        for secid, info in fetched.items():
+            self._remember(secid, info)
+        if fetched:
+            sqlighter3_RTS_day.save_securities(self.connection, fetched)
 
-    data = [{k: r[i] for i, k in enumerate(j['description']['columns'])} for r in
-            j['description']['data']]
-    df = pd.DataFrame(data)
+    def prefetch(self, secids, tradedate=None) -> None:
+        """
+        Загружает в кэш описания сразу для всех SECID ответа: сначала из памяти и БД,
+        неизвестные или устаревшие — запросами к MOEX, новые записи сохраняются одной транзакцией.
+        """
+        stale = self._stale(secids, tradedate)
+        self.requests += len(stale)
+        self._store({secid: fetch_security_info(self.session, secid) for secid in stale})
 
-    shortname = df.loc[df['name'] == 'SHORTNAME', 'value'].values[0] if 'SHORTNAME' in df[
-        'name'].values else ""
-    lsttrade = df.loc[df['name'] == 'LSTTRADE', 'value'].values[0] if 'LSTTRADE' in df[
-        'name'].values else \
-        df.loc[df['name'] == 'LSTDELDATE', 'value'].values[0] if 'LSTDELDATE' in df[
-            'name'].values else "2130-01-01"
+    async def prefetch_async(self, iss: 'AsyncIss', secids, tradedate=None) -> None:
+        """
+        То же, что prefetch, но неизвестные SECID запрашиваются параллельно через AsyncIss.
+        Одновременные запросы одного SECID из разных задач объединяются.
+        """
+        stale = self._stale(secids, tradedate)
+        own = set()  # Запросы этой задачи: их результат сохраняется в БД
+        for secid in stale:
+            if secid in self.inflight:
+                self.hits += 1  # Уже запрошено другой задачей
+            else:
+                self.requests += 1
+                own.add(secid)
+                self.inflight[secid] = asyncio.ensure_future(iss.get_security_info(secid))
+        tasks = {secid: self.inflight[secid] for secid in stale}
+        try:
+            results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        finally:
+            for secid in own:
+                self.inflight.pop(secid, None)
+        self._store({secid: info for secid, info in results.items() if secid in own})
+        for secid, info in results.items():
+            if secid not in own and info is not None:
+                self._remember(secid, info)
+
+    def missing(self, secids, tradedate=None) -> list[str]:
+        """SECID, описаний которых нет в памяти (запрос после prefetch не удался)"""
+        return [secid for secid in dict.fromkeys(secids)
+                if secid not in self.memory or not self._is_fresh(self.memory[secid], tradedate)]
 
-    return pd.Series([shortname, lsttrade])  # Гарантируем возврат 2 значений
+    def get(self, secid: str, tradedate=None) -> tuple[str, str]:
+        """
+        SHORTNAME и дата последних торгов (LSTTRADE, иначе LSTDELDATE, иначе '2130-01-01').
+        Без сессии requests (асинхронный режим) синхронный запрос не выполняется.
+        """
+        info = self.memory.get(secid)
+        if (info is None or not self._is_fresh(info, tradedate)) and self.session is not None:
+            self.prefetch([secid], tradedate)
+            info = self.memory.get(secid)
+        if info is None:
+            return "", "2130-01-01"
+        return info['SHORTNAME'], info['LSTTRADE'] or info['LSTDELDATE'] or "2130-01-01"
+
+    def summary(self) -> str:
+        return f"описаний инструментов: из кэша {self.hits}, запросов к MOEX {self.requests}"
 
 
 def get_future_date_results(
@@ -51,7 +205,8 @@ def get_future_date_results(
         tradedate: datetime.date,
         ticker: str,
         connection: sqlite3.Connection,
-        cursor: sqlite3.Cursor
+        cursor: sqlite3.Cursor,
+        cache: SecurityCache | None = None
 ) -> None:
     """
     Получает данные по фьючерсам с MOEX ISS API и сохраняет их в базу данных.
@@ -61,62 +216,434 @@ def get_future_date_results(
     :param ticker: Тикер инструмента (например, 'RTS').
     :param connection: Соединение с базой данных SQLite.
     :param cursor: Курсор для выполнения SQL-запросов.
+    :param cache: Кэш описаний инструментов (по умолчанию создаётся в БД котировок).
     """
     today_date = datetime.now().date()  # Текущая дата и время
-    while tradedate < today_date:
-        # Нет записи с такой датой
-        if not sqlighter3_RTS_day.tradedate_futures_exists(connection, cursor, tradedate):
-            url = (
-                f'https://iss.moex.com/iss/history/engines/futures/markets/forts/securities.json?'
-                f'date={tradedate}&assetcode={ticker}'
-            )
-            print(url)
-            j = request_moex(session, url)
-            if not j or 'history' not in j or not j['history'].get('data'):
-                print(f"Нет данных для {tradedate}")
-                tradedate += timedelta(days=1)
-                continue
-
-            data = [{k: r[i] for i, k in enumerate(j['history']['columns'])} for r in
-                    j['history']['data']]
-            df = pd.DataFrame(data).dropna(subset=['OPEN', 'LOW', 'HIGH', 'CLOSE'])
-            # print(df.to_string(max_rows=20, max_cols=20))
-
-            if len(df) == 0:
-                tradedate += timedelta(days=1)
-                continue
-
-            df[['SHORTNAME', 'LSTTRADE']] = df.apply(
-                lambda x: get_info_future(session, x['SECID']), axis=1, result_type='expand'
-            )
-            df["LSTTRADE"] = pd.to_datetime(df["LSTTRADE"], errors='coerce').dt.date.fillna(
-                '2130-01-01')
-            df = df[df['LSTTRADE'] > tradedate].dropna(subset=['OPEN', 'LOW', 'HIGH', 'CLOSE'])
-            df = df[df['LSTTRADE'] == df['LSTTRADE'].min()].reset_index(drop=True)
-
-            if len(df) == 1 and not df['OPEN'].isnull().values.any():
-                sqlighter3_RTS_day.add_tradedate_future(
-                    connection, cursor, df.loc[0]['TRADEDATE'], df.loc[0]['SECID'],
-                    float(df.loc[0]['OPEN']), float(df.loc[0]['LOW']),
-                    float(df.loc[0]['HIGH']), float(df.loc[0]['CLOSE']),
-                    df.loc[0]['LSTTRADE']
+    with sqlighter3_RTS_day.FuturesWriter(connection) as writer:  # Даты БД читаются один раз
+        while tradedate < today_date:
+            # Нет записи с такой датой
+            if tradedate not in writer:
+                url = (
+                    f'https://iss.moex.com/iss/history/engines/futures/markets/forts/securities.json?'
+                    f'date={tradedate}&assetcode={ticker}'
                 )
-                df = df.drop([
-                    'OPENPOSITIONVALUE', 'VALUE', 'SETTLEPRICE', 'SWAPRATE', 'WAPRICE',
-                    'SETTLEPRICEDAY', 'NUMTRADES', 'SHORTNAME', 'CHANGE', 'QTY'
-                ], axis=1)
-                print(df.to_string(max_rows=5, max_cols=20))
-                print('Строка записана в БД', '\n')
+                print(url)
+                j = request_moex(session, url)
+                if not j or 'history' not in j or not j['history'].get('data'):
+                    print(f"Нет данных для {tradedate}")
+                    tradedate += timedelta(days=1)
+                    continue
+
+                data = [{k: r[i] for i, k in enumerate(j['history']['columns'])} for r in
+                        j['history']['data']]
+                df = pd.DataFrame(data).dropna(subset=['OPEN', 'LOW', 'HIGH', 'CLOSE'])
+                # print(df.to_string(max_rows=20, max_cols=20))
+
+                if len(df) == 0:
+                    tradedate += timedelta(days=1)
+                    continue
+
+                if cache is None:
+                    cache = SecurityCache(session, connection)
+                cache.prefetch(df['SECID'], tradedate)  # Одна выборка на все SECID ответа
+                save_front_contract(writer, front_contract(df, tradedate, cache))
+            tradedate += timedelta(days=1)
+
+
+def front_contract(df: pd.DataFrame, tradedate: datetime.date, cache: SecurityCache) -> pd.DataFrame:
+    """
+    Из истории торгов за день оставляет ближайший неистёкший контракт (строка с минимальным LSTTRADE).
+    Описания SECID берутся из кэша (заранее загруженные prefetch).
+    """
+    info = {secid: cache.get(secid, tradedate) for secid in df['SECID'].unique()}
+    df = df.copy()
+    df['SHORTNAME'] = df['SECID'].map(lambda secid: info[secid][0])
+    df['LSTTRADE'] = df['SECID'].map(lambda secid: info[secid][1])
+    df["LSTTRADE"] = pd.to_datetime(df["LSTTRADE"], errors='coerce').dt.date.fillna(
+        '2130-01-01')
+    df = df[df['LSTTRADE'] > tradedate].dropna(subset=['OPEN', 'LOW', 'HIGH', 'CLOSE'])
+    return df[df['LSTTRADE'] == df['LSTTRADE'].min()].reset_index(drop=True)
+
+
+def save_front_contract(writer: sqlighter3_RTS_day.FuturesWriter, df: pd.DataFrame) -> bool:
+    """Добавляет в буфер записи строку ближайшего контракта, если она однозначна. Возвращает True при записи"""
+    if len(df) == 1 and not df['OPEN'].isnull().values.any():
+        writer.add_many(df)
+        df = df.drop([
+            'OPENPOSITIONVALUE', 'VALUE', 'SETTLEPRICE', 'SWAPRATE', 'WAPRICE',
+            'SETTLEPRICEDAY', 'NUMTRADES', 'SHORTNAME', 'CHANGE', 'QTY'
+        ], axis=1, errors='ignore')
+        print(df.to_string(max_rows=5, max_cols=20))
+        print('Строка добавлена к записи в БД', '\n')
+        return True
+    return False
+
+
+CONTRACT_LIFETIME_DAYS = 550  # С запасом: сколько дней до последнего дня торгов контракт может торговаться
+
+
+async def get_contracts(iss: 'AsyncIss', ticker: str, cache: SecurityCache) -> pd.DataFrame:
+    """
+    Список контрактов (в том числе истёкших) по коду базового актива: SECID и LSTTRADE.
+    """
+    url = (
+        f'https://iss.moex.com/iss/statistics/engines/futures/markets/forts/series.json?'
+        f'asset_code={ticker}&show_expired=1'
+    )
+    j = await iss.get_json(url)
+    if not j or 'series' not in j or not j['series'].get('data'):
+        return pd.DataFrame(columns=['SECID', 'LSTTRADE'])
+    df = pd.DataFrame(iss_rows(j, 'series'))
+    df.columns = [column.upper() for column in df.columns]
+    lsttrade_column = next((c for c in ('LAST_TRADE_DATE', 'LSTTRADE', 'LASTTRADEDATE', 'EXPIRATION_DATE')
+                            if c in df.columns), None)
+    if lsttrade_column is None:  # Нет дат в списке: берём из описания инструмента
+        await cache.prefetch_async(iss, df['SECID'])
+        missing = cache.missing(df['SECID'])
+        if missing:  # Без дат нельзя выбрать ближайший контракт
+            print(f"{ticker}: не удалось получить описание {', '.join(missing)}")
+            return pd.DataFrame(columns=['SECID', 'LSTTRADE'])
+        df['LSTTRADE'] = df['SECID'].map(lambda secid: cache.get(secid)[1])
+    else:
+        df['LSTTRADE'] = df[lsttrade_column]
+    df['LSTTRADE'] = pd.to_datetime(df['LSTTRADE'], errors='coerce').dt.date
+    return df.dropna(subset=['LSTTRADE'])[['SECID', 'LSTTRADE']].drop_duplicates().reset_index(drop=True)
+
+
+async def get_contract_history(iss: 'AsyncIss', secid: str,
+                               date_from: datetime.date, date_till: datetime.date) -> pd.DataFrame | None:
+    """
+    Дневная история одного контракта за период (from/till) с постраничной выборкой (start).
+    None — запрос одной из страниц не удался (ошибка после всех повторов): неполную историю
+    нельзя отличить от отсутствия торгов.
+    """
+    rows = []
+    start = 0
+    while True:
+        url = (
+            f'https://iss.moex.com/iss/history/engines/futures/markets/forts/securities/{secid}.json?'
+            f'from={date_from}&till={date_till}&start={start}'
+        )
+        print(url)
+        j = await iss.get_json(url)
+        if j is None:
+            return None
+        if 'history' not in j or not j['history'].get('data'):
+            break
+        page = iss_rows(j, 'history')
+        rows.extend(page)
+        start += len(page)
+        cursor = iss_rows(j, 'history.cursor') if 'history.cursor' in j else []
+        if cursor and start >= cursor[0]['TOTAL']:
+            break
+    return pd.DataFrame(rows)
+
+
+def build_continuous_series(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Непрерывный ряд ближайшего контракта за один проход: на каждую дату берётся контракт
+    с минимальным LSTTRADE, который ещё не истёк (LSTTRADE > TRADEDATE) и имеет OHLC.
+    """
+    df = df.dropna(subset=['OPEN', 'LOW', 'HIGH', 'CLOSE']).copy()
+    df['TRADEDATE'] = pd.to_datetime(df['TRADEDATE']).dt.date
+    df = df[df['LSTTRADE'] > df['TRADEDATE']]
+    df = df.sort_values(['TRADEDATE', 'LSTTRADE']).drop_duplicates('TRADEDATE', keep='first')
+    return df[['TRADEDATE', 'SECID', 'OPEN', 'LOW', 'HIGH', 'CLOSE', 'LSTTRADE']].reset_index(drop=True)
+
+
+async def get_future_range_results(
+        iss: 'AsyncIss',
+        tradedate: datetime.date,
+        ticker: str,
+        connection: sqlite3.Connection,
+        cache: SecurityCache
+) -> int | None:
+    """
+    Загружает историю всех контрактов тикера с tradedate по вчерашний день запросами по диапазону
+    дат (контракты — параллельно, в пределах IssConfig), строит ряд ближайшего контракта
+    и сохраняет отсутствующие в БД даты. Если историю какого-то контракта загрузить не удалось,
+    ближайший контракт с начала его периода неизвестен: записываются только даты до этого дня,
+    остальные загрузит следующий запуск (продолжение по get_max_date_futures, как в get_future_dates_async).
+    Возвращает число записанных строк или None, если список контрактов получить не удалось
+    (тогда нужна загрузка по дням).
+
+    :param iss: Асинхронный клиент MOEX ISS (общий пул соединений и ограничение частоты).
+    :param tradedate: Дата начала загрузки данных.
+    :param ticker: Тикер инструмента (например, 'RTS').
+    :param connection: Соединение с базой данных SQLite.
+    :param cache: Кэш описаний инструментов (нужен, если в списке контрактов нет дат).
+    """
+    date_till = datetime.now().date() - timedelta(days=1)
+    contracts = await get_contracts(iss, ticker, cache)
+    if contracts.empty:
+        print(f"Не удалось получить список контрактов {ticker}")
+        return None
+    # Контракты, которые могли торговаться в периоде загрузки
+    contracts = contracts[
+        (contracts['LSTTRADE'] > tradedate) &
+        (contracts['LSTTRADE'] - timedelta(days=CONTRACT_LIFETIME_DAYS) <= date_till)
+    ]
+    periods = [(secid, lsttrade, max(tradedate, lsttrade - timedelta(days=CONTRACT_LIFETIME_DAYS)))
+               for secid, lsttrade in contracts.itertuples(index=False)]
+    histories = await asyncio.gather(*(
+        get_contract_history(iss, secid, date_from, min(date_till, lsttrade))
+        for secid, lsttrade, date_from in periods
+    ))
+    frames, failed_from = [], None
+    for (secid, lsttrade, date_from), df in zip(periods, histories):
+        if df is None:
+            print(f"{ticker}: не удалось загрузить историю {secid} с {date_from}")
+            failed_from = date_from if failed_from is None else min(failed_from, date_from)
+        elif not df.empty:
+            df['LSTTRADE'] = lsttrade
+            frames.append(df)
+    if not frames:
+        print(f"Нет данных для {ticker} с {tradedate}")
+        return 0
+
+    df = build_continuous_series(pd.concat(frames, ignore_index=True))
+    if failed_from is not None:
+        df = df[df['TRADEDATE'] < failed_from]
+        print(f"{ticker}: записываются даты до {failed_from}, остальные — при следующем запуске")
+    existing = sqlighter3_RTS_day.get_tradedates(connection)
+    written = sqlighter3_RTS_day.add_futures(connection, df[~df['TRADEDATE'].astype(str).isin(existing)])
+    print(df.to_string(max_rows=10, max_cols=20))
+    print(f'{ticker}: записано в БД строк: {written}', '\n')
+    return written
+
+
+@dataclass
+class IssConfig:
+    """
+    Настройки асинхронной загрузки с MOEX ISS.
+    """
+    concurrency: int = 8  # Одновременных запросов
+    rate: float = 10.0  # Запросов в секунду (в среднем)
+    burst: int = 5  # Запросов, которые можно отправить подряд без паузы
+    connect_timeout: float = 5  # Таймаут установки соединения, сек
+    request_timeout: float = 20  # Таймаут одного запроса целиком, сек
+    retries: int = 4  # Попыток на запрос
+    backoff_base: float = 0.5  # Базовая пауза перед повтором, сек (растёт экспоненциально)
+    backoff_max: float = 15.0  # Максимальная пауза перед повтором, сек
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов (token bucket): в среднем rate запросов в секунду,
+    не более burst подряд.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncIss:
+    """
+    Асинхронный клиент MOEX ISS: пул соединений aiohttp, ограничение числа одновременных
+    запросов и их частоты, повторы сетевых ошибок, 429 и 5xx с экспоненциальной паузой
+    со случайным разбросом. Считает запросы, повторы и ошибки для итоговой сводки.
+    """
+
+    def __init__(self, config: IssConfig | None = None) -> None:
+        self.config = config or IssConfig()
+        self.session = None
+        self.semaphore = asyncio.Semaphore(self.config.concurrency)
+        self.limiter = RateLimiter(self.config.rate, self.config.burst)
+        self.requests = 0
+        self.retried = 0
+        self.errors = 0
+
+    async def __aenter__(self) -> 'AsyncIss':
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.config.concurrency, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=self.config.request_timeout,
+                                          sock_connect=self.config.connect_timeout),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Стоит ли повторять запрос: сетевые ошибки, таймауты, 429 и 5xx"""
+        import aiohttp
+
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+    async def get_json(self, url: str) -> dict | None:
+        """JSON ответа ISS или None, если все попытки завершились ошибкой"""
+        cache = http_cache.get_cache()
+        if cache.replay:
+            cached = cache.load(url)
+            return cached.json() if cached else None
+        async with self.semaphore:
+            for attempt in range(self.config.retries):
+                await self.limiter.acquire()
+                self.requests += 1
+                try:
+                    async with self.session.get(url) as response:
+                        response.raise_for_status()
+                        if cache.record:
+                            body = await response.read()
+                            cache.save(url, response.status, response.headers, body)
+                            return json.loads(body)
+                        return await response.json(content_type=None)
+                except Exception as e:
+                    if attempt < self.config.retries - 1 and self.is_retryable(e):
+                        self.retried += 1
+                        delay = min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt)
+                        await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+                        continue
+                    print(f"Ошибка запроса {url} (попытка {attempt + 1}): {type(e).__name__} {e}")
+                    self.errors += 1
+                    return None
+        return None
+
+    async def get_security_info(self, security: str) -> dict | None:
+        """Описание инструмента (см. parse_security_info)"""
+        return parse_security_info(await self.get_json(f'https://iss.moex.com/iss/securities/{security}.json'))
+
+
+async def get_future_dates_async(
+        iss: AsyncIss,
+        tradedate: datetime.date,
+        ticker: str,
+        connection: sqlite3.Connection,
+        cursor: sqlite3.Cursor,
+        cache: SecurityCache
+) -> int:
+    """
+    Асинхронный вариант get_future_date_results: истории за все отсутствующие в БД дни
+    запрашиваются параллельно (в пределах IssConfig), а записываются строго по возрастанию
+    даты. Если день не удалось загрузить (ошибка после всех повторов), запись останавливается
+    на предыдущем дне, чтобы продолжение по get_max_date_futures не оставило пропуска.
+    В конце печатается сводка по тикеру: дни, строки, скорость. Возвращает число обработанных дней.
+    """
+    started = time.monotonic()
+    today_date = datetime.now().date()
+    writer = sqlighter3_RTS_day.FuturesWriter(connection)  # Даты БД читаются один раз
+    dates = []
+    while tradedate < today_date:
+        if tradedate not in writer:
+            dates.append(tradedate)
         tradedate += timedelta(days=1)
 
+    async def fetch_day(day: datetime.date) -> pd.DataFrame | None:
+        """Ближайший контракт за день (пустая таблица — нет торгов), None — ошибка загрузки"""
+        url = (
+            f'https://iss.moex.com/iss/history/engines/futures/markets/forts/securities.json?'
+            f'date={day}&assetcode={ticker}'
+        )
+        j = await iss.get_json(url)
+        if j is None:
+            return None
+        if 'history' not in j or not j['history'].get('data'):
+            return pd.DataFrame()
+        df = pd.DataFrame(iss_rows(j, 'history')).dropna(subset=['OPEN', 'LOW', 'HIGH', 'CLOSE'])
+        if df.empty:
+            return df
+        await cache.prefetch_async(iss, df['SECID'], day)
+        missing = cache.missing(df['SECID'], day)
+        if missing:  # Без описания нельзя выбрать ближайший контракт
+            print(f"{day}: не удалось получить описание {', '.join(missing)}")
+            return None
+        return front_contract(df, day, cache)
 
-if __name__ == '__main__':  # Точка входа при запуске этого скрипта
-    ticker = 'RTS'
-    path_db = Path(fr'c:\Users\Alkor\gd\data_quote_db\{ticker}_day_rss_2025.db')
-    start_date = datetime.strptime('2025-01-01', "%Y-%m-%d").date()
+    tasks = [asyncio.ensure_future(fetch_day(day)) for day in dates]
+    written = done = 0
+    try:
+        for day, task in zip(dates, tasks):  # Ожидание по порядку дат: запись идёт по возрастанию
+            df = await task
+            if df is None:
+                print(f"Не удалось загрузить {day}: запись остановлена, продолжение со следующего запуска")
+                break
+            done += 1
+            if df.empty:
+                print(f"Нет данных для {day}")
+            elif save_front_contract(writer, df):
+                written += 1
+    finally:
+        writer.flush()  # Буфер — непрерывный префикс дат, запись по порядку сохраняется
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    elapsed = time.monotonic() - started
+    print(
+        f"{ticker}: дней {done} из {len(dates)}, записано строк {written}, {cache.summary()}; "
+        f"{elapsed:.1f} с, {done / elapsed if elapsed else 0:.1f} дн/с"
+    )
+    return done
+
+
+async def load_ticker(iss: AsyncIss, mode: str, ticker: str, tradedate: datetime.date,
+                      connection: sqlite3.Connection, cursor: sqlite3.Cursor) -> int:
+    """
+    Загрузка одного тикера в режиме mode: 'range' — по диапазонам дат (без списка контрактов —
+    по дням), 'async' — по дням. Возвращает число записанных (range) или обработанных (async) дней.
+    """
+    cache = SecurityCache(None, connection)
+    if mode == 'range':
+        written = await get_future_range_results(iss, tradedate, ticker, connection, cache)
+        if written is not None:
+            print(f"{ticker}: {cache.summary()}")
+            return written
+    return await get_future_dates_async(iss, tradedate, ticker, connection, cursor, cache)
+
+
+async def run_async_many(jobs: list[tuple], config: IssConfig | None = None, mode: str = 'async') -> None:
+    """
+    Загрузка нескольких тикеров одновременно: jobs — (ticker, tradedate, connection, cursor),
+    mode — 'range' или 'async' (см. load_ticker). У каждого тикера своя БД и свой кэш описаний,
+    пул соединений и ограничение частоты запросов — общие.
+    Время работы определяется самым долгим тикером, а не суммой по всем.
+    """
+    started = time.monotonic()
+    async with AsyncIss(config) as iss:
+        days = await asyncio.gather(*(
+            load_ticker(iss, mode, ticker, tradedate, connection, cursor)
+            for ticker, tradedate, connection, cursor in jobs
+        ))
+    elapsed = time.monotonic() - started
+    print(
+        f"Итого: тикеров {len(jobs)}, дней {sum(days)}, "
+        f"запросов {iss.requests} (повторов {iss.retried}, ошибок {iss.errors}); "
+        f"{elapsed:.1f} с, {iss.requests / elapsed if elapsed else 0:.1f} запр/с, "
+        f"{sum(days) / elapsed if elapsed else 0:.1f} дн/с"
+    )
 
-    connection = sqlite3.connect(path_db, check_same_thread=True)
+
+def open_quote_db(path_db: Path, start_date: datetime.date) -> tuple[sqlite3.Connection, sqlite3.Cursor, datetime.date]:
+    """
+    Открывает (создаёт) БД котировок тикера. Если в ней есть данные, удаляет последнюю дату
+    (она могла быть записана до окончания торгов) и продолжает загрузку с неё.
+    Возвращает соединение, курсор и дату начала загрузки.
+    """
+    path_db.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlighter3_connect.get_connection(path_db)
     cursor = connection.cursor()
+    sqlighter3_RTS_day.create_tables(connection)
 
     # Если таблица Futures не пустая
     if sqlighter3_RTS_day.non_empty_table_futures(connection, cursor):
@@ -128,15 +655,67 @@ if __name__ == '__main__':  # Точка входа при запуске это
             connection.commit()
 
         # Меняем стартовую дату на дату последней записи плюс 1 день
-        start_date = datetime.strptime(sqlighter3_RTS_day.get_max_date_futures(connection, cursor),
-                                       "%Y-%m-%d").date() + timedelta(days=1)
+        max_date = sqlighter3_RTS_day.get_max_date_futures(connection, cursor)
+        if max_date:
+            start_date = datetime.strptime(max_date, "%Y-%m-%d").date() + timedelta(days=1)
+    return connection, cursor, start_date
+
+
+if __name__ == '__main__':  # Точка входа при запуске этого скрипта
+    parser = argparse.ArgumentParser(description="Загрузка дневных котировок фьючерсов с MOEX ISS")
+    parser.add_argument('--mode', choices=('range', 'daily', 'async'), default='range',
+                        help="range — история контрактов по диапазону дат, daily — запрос на каждый день, "
+                             "async — запросы по дням параллельно (aiohttp)")
+    parser.add_argument('--http-cache', choices=http_cache.MODES,
+                        help="Кэш ответов ISS: record — сохранять, replay — работать без сети "
+                             "(по умолчанию HTTP_CACHE_MODE или passthrough)")
+    parser.add_argument('--concurrency', type=int, default=IssConfig.concurrency,
+                        help="Одновременных запросов в режимах range и async")
+    parser.add_argument('--rate', type=float, default=IssConfig.rate,
+                        help="Запросов в секунду в режимах range и async")
+    parser.add_argument('--tickers', nargs='+', default=['RTS'],
+                        help="Коды базовых активов (RTS Si BR GOLD MIX ...), у каждого своя БД {ticker}_day_rss_2025.db; "
+                             "в режимах range и async загружаются одновременно")
+    parser.add_argument('--db-dir', default=r'c:\Users\Alkor\gd\data_quote_db', help="Папка с БД котировок")
+    parser.add_argument('--news-db', default=r'C:\Users\Alkor\gd\data_rss_db\rss_news_investing.db',
+                        help="БД новостей, в которой обновляется привязка новостей к свечам первого тикера")
+    parser.add_argument('--news-store', help="Каталог хранилища новостей по периодам (вместо --news-db)")
+    args = parser.parse_args()
+
+    response_cache = http_cache.configure(args.http_cache)
+
+    start_date = datetime.strptime('2025-01-01', "%Y-%m-%d").date()
+    jobs = [(ticker, *open_quote_db(Path(args.db_dir) / f'{ticker}_day_rss_2025.db', start_date))
+            for ticker in args.tickers]
+
+    if args.mode in ('range', 'async'):  # Тикеры одновременно, пул соединений и ограничение частоты общие
+        asyncio.run(run_async_many([(ticker, start, connection, cursor)
+                                    for ticker, connection, cursor, start in jobs],
+                                   IssConfig(concurrency=args.concurrency, rate=args.rate), args.mode))
+    else:
+        with requests.Session() as session:
+            for ticker, connection, cursor, start in jobs:  # Прежний режим daily — тикеры по очереди
+                cache = SecurityCache(session, connection)
+                get_future_date_results(session, start, ticker, connection, cursor, cache)
+                print(f"{ticker}: кэш: {cache.summary()}")
+
+    if response_cache.mode != 'passthrough':
+        print(response_cache.summary())
 
-    with requests.Session() as session:
-        get_future_date_results(session, start_date, ticker, connection, cursor)
+    if args.news_store:
+        count = news_partitions.NewsStore(args.news_store).sync_bars(sqlighter3_RTS_day.get_tradedates(jobs[0][1]))
+        print(f"{jobs[0][0]}: привязка новостей к свечам в хранилище, перепривязано: {count}")
+    elif Path(args.news_db).exists():
+        news_connection = sqlighter3_connect.get_connection(args.news_db)
+        sqlighter3_news.create_tables(news_connection)
+        count = sqlighter3_news.sync_bars(news_connection, sqlighter3_RTS_day.get_tradedates(jobs[0][1]))
+        print(f"{jobs[0][0]}: привязка новостей к свечам, перепривязано: {count}")
 
-    # Выполняем команду VACUUM
-    cursor.execute("VACUUM;")
+    for ticker, connection, cursor, _ in jobs:
+        # Возвращаем место после удаления: шаг incremental_vacuum, полный VACUUM — только выше порога
+        stats = sqlighter3_connect.reclaim_space(connection)
+        print(f"{ticker}: освобождение места: {sqlighter3_connect.format_stats(stats)}")
+        cursor.close()
 
-    # Закрываем курсор и соединение
-    cursor.close()
-    connection.close()
+    # Закрываем соединения
+    sqlighter3_connect.close_all()